@@ -0,0 +1,82 @@
+"""
+Benchmark: memória e carga do XP em dicts (leveling.json) x colunar (leveling.bin)
+Desenvolvido por: MARKIZIN
+
+Mede também o índice de ranking que o primeiro /rank ou /top monta
+(tuplas no layout dict, um int por membro no colunar).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_leveling_memory.py --users 1000000
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.leveling_columnar import ColumnarGuild, dump_columnar, load_columnar  # noqa: E402
+from modules.leveling_system import ColumnarLevelingSystem, LevelingSystem  # noqa: E402
+from modules.rank_index import SortedBuckets  # noqa: E402
+from modules.serialization import dumpb, loads  # noqa: E402
+
+GUILD = "123456789012345678"
+
+
+def make_users(count: int) -> dict:
+    rng = random.Random(42)
+    base = 100_000_000_000_000_000
+    return {
+        str(base + i * 7919): {"xp": rng.randint(0, 500_000), "messages": rng.randint(0, 50_000)}
+        for i in range(count)
+    }
+
+
+def measure(build):
+    """(objeto, bytes alocados, segundos) para construir com `build()`."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    raw_json = dumpb({GUILD: make_users(args.users)})
+    raw_bin = dump_columnar({GUILD: ColumnarGuild.from_dict(loads(raw_json)[GUILD])})
+
+    legacy, legacy_bytes, legacy_s = measure(lambda: loads(raw_json))
+    # IDs continuam str aqui: o int(uid) entra na medição, como no LevelingSystem
+    legacy_pairs = [(uid, d.get("xp", 0)) for uid, d in legacy[GUILD].items()]
+    del legacy
+    _, legacy_rank_bytes, _ = measure(lambda: SortedBuckets(
+        LevelingSystem._rank_key(xp, int(uid)) for uid, xp in legacy_pairs))
+    columnar, columnar_bytes, columnar_s = measure(lambda: load_columnar(raw_bin))
+    _, columnar_rank_bytes, _ = measure(lambda: SortedBuckets(
+        ColumnarLevelingSystem._rank_key(xp, uid) for uid, xp in columnar[GUILD].xp_pairs()))
+
+    mb = 1024 * 1024
+    print(f"membros: {args.users:,}")
+    print(f"{'layout':<10} {'memória (MB)':>13} {'B/membro':>9} {'+ ranking':>10} "
+          f"{'total B/m':>10} {'disco (MB)':>11} {'carga (s)':>10}")
+    for name, size, rank, disk, secs in (
+        ("dict", legacy_bytes, legacy_rank_bytes, len(raw_json), legacy_s),
+        ("colunar", columnar_bytes, columnar_rank_bytes, len(raw_bin), columnar_s),
+    ):
+        print(f"{name:<10} {size / mb:>13.1f} {size / args.users:>9.1f} {rank / args.users:>10.1f} "
+              f"{(size + rank) / args.users:>10.1f} {disk / mb:>11.1f} {secs:>10.3f}")
+    print(f"arrays: {columnar[GUILD].nbytes() / mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
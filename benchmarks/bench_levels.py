@@ -0,0 +1,46 @@
+"""
+Benchmark: cálculo de nível por laço (antigo) x tabela acumulada + bisect
+(e, acima da tabela, a inversa exata da fórmula fechada)
+Desenvolvido por: MARKIZIN
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_levels.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.leveling_system import _level_from_xp, _total_xp_for_level, _xp_for_level, _xp_progress  # noqa: E402
+
+
+def legacy_level_from_xp(xp: int) -> int:
+    level = 0
+    while xp >= _xp_for_level(level):
+        xp -= _xp_for_level(level)
+        level += 1
+    return level
+
+
+def per_call_us(fn, xp: int, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(xp)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    print(f"{'nível':>7} {'XP total':>16} {'laço (us)':>11} {'novo (us)':>12}")
+    for level in (5, 50, 500, 5_000, 50_000):
+        xp = _total_xp_for_level(level) + 1
+        assert _level_from_xp(xp) == legacy_level_from_xp(xp) == level
+        assert _xp_progress(xp) == (level, 1, _xp_for_level(level))
+        calls = max(20, 200_000 // (level + 1))
+        old = per_call_us(legacy_level_from_xp, xp, calls)
+        new = per_call_us(_level_from_xp, xp, 200_000)
+        print(f"{level:>7} {xp:>16,} {old:>11.2f} {new:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: json padrão (indent=2, como era) x modules.serialization
+Desenvolvido por: MARKIZIN
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --guilds 50 --users 20000
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules import serialization  # noqa: E402
+
+
+def make_leveling(guilds: int, users: int) -> dict:
+    rnd = random.Random(1)
+    return {
+        str(10**17 + g): {
+            str(10**17 + u): {"xp": rnd.randint(0, 500_000), "level": rnd.randint(0, 80),
+                              "messages": rnd.randint(0, 50_000), "last_xp": 1700000000.0 + u}
+            for u in range(users)
+        }
+        for g in range(guilds)
+    }
+
+
+def make_stats(guilds: int, days: int) -> dict:
+    rnd = random.Random(2)
+    return {
+        str(10**17 + g): {
+            "members": {"joins": [{"user_id": 10**17 + i, "timestamp": "2026-01-01T00:00:00"} for i in range(days * 5)],
+                        "leaves": []},
+            "activity": {"messages": rnd.randint(0, 10**6), "daily": {f"2026-01-{d % 28 + 1:02d}": rnd.randint(0, 5000)
+                                                                        for d in range(days)}},
+        }
+        for g in range(guilds)
+    }
+
+
+def make_inventory(users: int) -> dict:
+    items = ["VIP", "Cargo Colorido", "Caixa Misteriosa", "Emoji Personalizado", "Título ✨"]
+    return {"seq": users * 3, "data": {str(10**17 + u): [items[u % 5], items[(u * 7) % 5]] for u in range(users)}}
+
+
+def timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench(name: str, data, repeat: int, tmpdir: Path):
+    legacy_path = tmpdir / f"{name}_legacy.json"
+    new_path = tmpdir / f"{name}.json"
+
+    def legacy_save():
+        legacy_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def legacy_load():
+        json.loads(legacy_path.read_text(encoding="utf-8"))
+
+    def new_save():
+        serialization.write_file(new_path, data)
+
+    def new_load():
+        serialization.read_file(new_path)
+
+    legacy_save()
+    new_save()
+    results = [timeit(f, repeat) for f in (legacy_save, legacy_load, new_save, new_load)]
+    sizes = (legacy_path.stat().st_size / 1024, new_path.stat().st_size / 1024)
+    print(f"{name:<12} {results[0]:>9.1f} {results[1]:>9.1f} {results[2]:>9.1f} {results[3]:>9.1f}"
+          f" {sizes[0]:>10.0f} {sizes[1]:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--users", type=int, default=5000, help="membros com XP por servidor")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Backend: {serialization.BACKEND}  (melhor de {args.repeat}, tempos em ms)")
+    print(f"{'store':<12} {'json save':>9} {'json load':>9} {'novo save':>9} {'novo load':>9}"
+          f" {'KB antes':>10} {'KB agora':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmpdir = Path(tmp)
+        bench("leveling", make_leveling(args.guilds, args.users), args.repeat, tmpdir)
+        bench("stats", make_stats(args.guilds, 365), args.repeat, tmpdir)
+        bench("inventory", make_inventory(args.guilds * args.users), args.repeat, tmpdir)
+
+
+if __name__ == "__main__":
+    main()
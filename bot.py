@@ -3,11 +3,10 @@ from discord import app_commands
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
-import json
 import asyncio
-from pathlib import Path
 import webbrowser
 import hashlib
+import re
 import sys
 from datetime import datetime, timezone, timedelta
 from discord.ext import tasks
@@ -16,6 +15,19 @@ from discord.ext import tasks
 from modules.panel_system import ConfigManager
 from modules.panel_command import create_painel_command
 from modules.panel_autorole import AutorolePanel  # usado apenas para tipagem/eventos
+from modules.economy_store import GuildEconomy, InventoryStore
+from modules.locks import KeyedLockManager
+from modules.automod import AutoModEngine
+from modules.reaction_roles import ReactionRoleIndex
+from modules.rate_window import SlidingWindowTracker
+from modules.message_pipeline import MessagePipeline, MessageContext, STOP
+from modules.storage import ROOT, get_storage
+from modules.ticket_activity import TicketActivityTracker
+from modules.ticket_registry import TicketRegistry
+from modules.ticket_transcripts import TranscriptStore
+from modules.transcript_archive import TranscriptArchive
+from modules.panel_tickets import forget_ticket, archive_transcript
+from modules.ticket_sla import TicketSLA, ALERT, priority_key
 from modules.components_v2 import make_card, make_success, make_error, make_info, brand_footer, BrandedView
 import random
 
@@ -152,77 +164,27 @@ tree = bot.tree
 
 # ==================== PERSISTÊNCIA ====================
 
-# Persistência de economia (JSON + lock)
-ECONOMY_FILE = Path("economia.json")
-economia_lock = asyncio.Lock()
-
-def load_economia():
-    """Carrega o arquivo de economia e retorna um dict com chaves int -> saldo."""
-    if not ECONOMY_FILE.exists():
-        return {}
-    try:
-        text = ECONOMY_FILE.read_text(encoding="utf-8")
-        data = json.loads(text)
-        return {int(k): v for k, v in data.items()}
-    except (json.JSONDecodeError, ValueError):
-        return {}
-
-def _save_economia_sync(dados):
-    """Salva dados em disco de forma atômica (sync)."""
-    serializable = {str(k): v for k, v in dados.items()}
-    tmp = ECONOMY_FILE.with_suffix(".tmp")
-    tmp.write_text(json.dumps(serializable, ensure_ascii=False), encoding="utf-8")
-    tmp.replace(ECONOMY_FILE)
-
-async def save_economia(dados):
-    """Wrapper assíncrono que delega escrita para executor."""
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _save_economia_sync, dados)
-
-economia = load_economia()
+# Persistência de economia (SQLite WAL + diário de transações, uma partição por servidor)
+# Locks por (guild, usuário): só serializa comandos que envolvem os mesmos membros
+economy_locks = KeyedLockManager()
+economy = GuildEconomy()
+# Como dividir o economia.json/economia.db global antigo: copiar | dividir | principal
+ECONOMY_MIGRATION_POLICY = os.getenv('ECONOMY_MIGRATION_POLICY', 'copiar')
 
 # ==================== INVENTÁRIO (LOJA) ====================
-INVENTORY_FILE = Path('inventory.json')
-inventory_lock = asyncio.Lock()
-
-def load_inventory():
-    if not INVENTORY_FILE.exists():
-        return {}
-    try:
-        data = json.loads(INVENTORY_FILE.read_text(encoding='utf-8'))
-        return {str(k): v for k,v in data.items()}
-    except Exception:
-        return {}
-
-def _save_inventory_sync(inv):
-    tmp = INVENTORY_FILE.with_suffix('.tmp')
-    tmp.write_text(json.dumps(inv, ensure_ascii=False), encoding='utf-8')
-    tmp.replace(INVENTORY_FILE)
-
-async def save_inventory(inv):
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _save_inventory_sync, inv)
-
-inventory = load_inventory()
+# Snapshot + diário append-only de compras (inventory.json no backend de arquivos)
+inventory = InventoryStore()
 
-# Persistência de configuração (JSON)
-CONFIG_FILE = Path("config.json")
+# Persistência de configuração (config.json no backend de arquivos)
+CONFIG_KEY = "config"
 
 def load_config():
-    """Carrega arquivo de configuração."""
-    if not CONFIG_FILE.exists():
-        return {}
-    try:
-        text = CONFIG_FILE.read_text(encoding="utf-8")
-        return json.loads(text)
-    except (json.JSONDecodeError, ValueError):
-        return {}
+    """Carrega configuração."""
+    return get_storage().get(ROOT, CONFIG_KEY, {})
 
 def _save_config_sync(dados):
-    """Salva configuração em disco de forma atômica (sync)."""
-    tmp = CONFIG_FILE.with_suffix(".tmp")
-    tmp.write_text(json.dumps(dados, ensure_ascii=False), encoding="utf-8")
-    tmp.replace(CONFIG_FILE)
+    """Salva configuração de forma atômica (sync)."""
+    get_storage().put(ROOT, CONFIG_KEY, dados)
 
 async def save_config(dados):
     """Wrapper assíncrono que delega escrita para executor."""
@@ -307,25 +269,19 @@ class TransferModal(discord.ui.Modal, title="Transferir creditos"):
             await interaction.response.send_message("Voce nao pode transferir para si mesmo.", ephemeral=True)
             return
 
-        async with economia_lock:
-            if sender_id not in economia:
-                economia[sender_id] = 0
-            if receiver_id not in economia:
-                economia[receiver_id] = 0
-
-            if economia[sender_id] < quantia:
-                await interaction.response.send_message("Saldo insuficiente.", ephemeral=True)
-                return
-
-            economia[sender_id] -= quantia
-            economia[receiver_id] += quantia
-            await save_economia(economia)
+        gid = interaction.guild.id
+        async with economy_locks.hold((gid, sender_id), (gid, receiver_id)):
+            store = await economy.fetch(gid)
+            saldo_restante = store.transfer(sender_id, receiver_id, quantia)
+        if saldo_restante is None:
+            await interaction.response.send_message("Saldo insuficiente.", ephemeral=True)
+            return
 
         view = make_card(
             title="Transferencia realizada",
             description=f"{interaction.user.mention} transferiu {quantia} créditos para {membro_destino.mention}",
             color=discord.Color.gold(),
-            fields=[("Saldo atual", str(economia.get(sender_id, 0)))],
+            fields=[("Saldo atual", str(saldo_restante))],
             author_id=interaction.user.id,
         )
         try:
@@ -402,98 +358,192 @@ async def send_help_ephemeral(interaction: discord.Interaction):
 
 from discord.ext import tasks
 
+def _ticket_category_ids(cfg: dict) -> list:
+    category_ids = cfg.get('category_ids', [])
+    if not category_ids and cfg.get('category_id'):
+        category_ids = [cfg.get('category_id')]
+    return category_ids
+
+
+def _legacy_ticket_channels(guild: discord.Guild, cfg: dict):
+    """Canais de ticket do formato antigo (dono só no tópico) ainda fora do registro."""
+    for cid in _ticket_category_ids(cfg):
+        cat = guild.get_channel(cid)
+        if not isinstance(cat, discord.CategoryChannel):
+            continue
+        for ch in cat.channels:
+            if isinstance(ch, discord.TextChannel) and ch.id not in ticket_registry and ch.topic and 'user:' in ch.topic:
+                yield ch
+
+
+def _topic_value(topic: str, key: str) -> str | None:
+    """Valor de `chave:` no tópico, até a próxima chave (a prioridade pode ter espaços)."""
+    match = re.search(rf'{key}:(.*?)(?=\s+\w+:|$)', topic or '')
+    return match.group(1).strip() if match else None
+
+
+def _topic_id(topic: str, key: str) -> int | None:
+    value = _topic_value(topic, key)
+    return int(value) if value and value.isdigit() else None
+
+
+_SLA_SEED_CONCURRENCY = 5
+
+
+async def _seed_ticket_indexes():
+    """Sincroniza registro, atividade e SLA com os canais que existem de fato.
+
+    Canais que sumiram saem dos índices, mas só em servidores disponíveis
+    (durante uma queda o cache não tem os canais, e o registro é a única
+    cópia de claim/abertura); tickets antigos (só com tópico) são
+    migrados para o registro uma única vez. A atividade vem do cache do
+    gateway (last_message_id / created_at), sem REST. O SLA de um ticket
+    desconhecido (só na primeira migração) é reconstruído uma única vez
+    lendo as últimas 50 mensagens, no máximo `_SLA_SEED_CONCURRENCY`
+    leituras em paralelo; depois disso tudo vem dos eventos.
+    """
+    known = {ch: t['guild_id'] for ch, t in ticket_sla.tickets.items()}
+    known.update((ch, gid) for gid, ch in ticket_activity.guild_channels())
+    known.update((ch, t['guild_id']) for ch, t in ticket_registry.tickets.items())
+    for channel_id, guild_id in known.items():
+        guild = bot.get_guild(guild_id)
+        if guild is None or guild.unavailable:
+            continue
+        if guild.get_channel(channel_id) is None:
+            forget_ticket(bot, channel_id)
+    unseeded = []
+    for guild in bot.guilds:
+        cfg = panel_config.get_guild_config(guild.id, 'tickets')
+        if not cfg.get('enabled'):
+            continue
+        for ch in list(_legacy_ticket_channels(guild, cfg)):
+            ticket_registry.open(
+                guild.id, ch.id, _topic_id(ch.topic, 'user'),
+                priority=_topic_value(ch.topic, 'priority'),
+                category_id=ch.category_id,
+                opened_at=ch.created_at.timestamp(),
+                claimed_by=_topic_id(ch.topic, 'claimed'),
+            )
+        for channel_id, ticket in ticket_registry.guild_tickets(guild.id):
+            ch = guild.get_channel(channel_id)
+            if not isinstance(ch, discord.TextChannel):
+                continue
+            if ch.id not in ticket_activity:
+                if ch.last_message_id:
+                    last = discord.utils.snowflake_time(ch.last_message_id)
+                else:
+                    last = ch.created_at
+                ticket_activity.touch(guild.id, ch.id, last.timestamp())
+            if ch.id not in ticket_sla:
+                unseeded.append((ch, ticket, cfg.get('support_role_ids', [])))
+    semaphore = asyncio.Semaphore(_SLA_SEED_CONCURRENCY)
+
+    async def seed_sla(ch, ticket, support):
+        responded_at = None
+        async with semaphore:
+            try:
+                async for msg in ch.history(limit=50):
+                    if not msg.author.bot and any(r.id in support for r in getattr(msg.author, 'roles', ())):
+                        responded_at = msg.created_at.timestamp()
+                        break
+            except Exception:
+                pass
+        ticket_sla.open(
+            ch.guild.id, ch.id, ticket.get('opener_id'), priority_key(ticket.get('priority')),
+            ticket.get('opened_at') or ch.created_at.timestamp(), responded_at=responded_at,
+        )
+
+    await asyncio.gather(*(seed_sla(*args) for args in unseeded))
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Canal de ticket apagado (à mão ou por outro bot) sai dos índices."""
+    if channel.id in ticket_registry or channel.id in ticket_activity or channel.id in ticket_sla:
+        forget_ticket(bot, channel.id)
+
+
 @tasks.loop(minutes=5)
 async def auto_close_tickets_task():
-    """Fecha tickets inativos automaticamente."""
+    """Fecha tickets inativos automaticamente (só os que venceram; sem ler histórico)."""
+    now = time.time()
     for guild in bot.guilds:
         cfg = panel_config.get_guild_config(guild.id, 'tickets')
         if not cfg.get('enabled') or not cfg.get('auto_close_minutes') or not cfg.get('auto_close_enabled', False):
             continue
         threshold_minutes = cfg.get('auto_close_minutes')
-        category_ids = cfg.get('category_ids', [])
-        if not category_ids and cfg.get('category_id'):
-            category_ids = [cfg.get('category_id')]
-        for cid in category_ids:
-            cat = guild.get_channel(cid)
-            if not isinstance(cat, discord.CategoryChannel):
+        for channel_id in ticket_activity.due(guild.id, threshold_minutes * 60, now):
+            ch = guild.get_channel(channel_id)
+            if not isinstance(ch, discord.TextChannel):
+                forget_ticket(bot, channel_id)
                 continue
-            for ch in cat.channels:
-                if not isinstance(ch, discord.TextChannel):
-                    continue
-                if not ch.topic or 'user:' not in ch.topic:
-                    continue
-                try:
-                    last_msg = None
-                    async for msg in ch.history(limit=1):
-                        last_msg = msg
-                        break
-                    if last_msg:
-                        delta = (_utcnow() - last_msg.created_at).total_seconds() / 60
-                        if delta >= threshold_minutes:
-                            await ch.send('⏰ Ticket fechado automaticamente por inatividade.')
-                            await asyncio.sleep(5)
-                            await ch.delete(reason='Auto-close por inatividade')
-                            closed = cfg.get('closed_counter', 0) + 1
-                            panel_config.update_guild_config(guild.id, 'tickets', {'closed_counter': closed})
-                except Exception:
-                    pass
+            try:
+                await ch.send('⏰ Ticket fechado automaticamente por inatividade.')
+                await asyncio.sleep(5)
+                if cfg.get('transcript_enabled'):
+                    # Sem HTML aqui, mas com o mesmo complemento do botão de fechar.
+                    # Antes do delete: on_guild_channel_delete tira o ticket dos índices
+                    await ticket_transcripts.backfill(ch)
+                    await archive_transcript(bot, guild.id, channel_id, ch.name, ticket_registry.get(channel_id) or {})
+                await ch.delete(reason='Auto-close por inatividade')
+                forget_ticket(bot, channel_id)
+                closed = panel_config.get_guild_config(guild.id, 'tickets').get('closed_counter', 0) + 1
+                panel_config.update_guild_config(guild.id, 'tickets', {'closed_counter': closed})
+            except Exception:
+                pass
+    ticket_activity.flush()
 
-@tasks.loop(minutes=10)
+@tasks.loop(minutes=1)
 async def sla_check_task():
-    """Verifica tickets em atraso e envia alertas."""
+    """Dispara alertas/escalonamentos de SLA vencidos (cada um uma única vez)."""
+    now = time.time()
     for guild in bot.guilds:
         cfg = panel_config.get_guild_config(guild.id, 'tickets')
-        if not cfg.get('enabled'):
-            continue
-        if not cfg.get('sla_enabled', True):
-            continue
-        sla_map = cfg.get('sla_by_priority')
-        legacy_sla = cfg.get('sla_minutes')
-        if not sla_map and not legacy_sla:
+        if not cfg.get('enabled') or not cfg.get('sla_enabled', True):
             continue
-        alert_roles = cfg.get('sla_alert_role_ids', [])
-        escalation_min = None  # escalonamento por prioridade pode ser adicionado depois
-        escalation_roles = cfg.get('escalation_role_ids', [])
-        category_ids = cfg.get('category_ids', [])
-        if not category_ids and cfg.get('category_id'):
-            category_ids = [cfg.get('category_id')]
-        for cid in category_ids:
-            cat = guild.get_channel(cid)
-            if not isinstance(cat, discord.CategoryChannel):
+        for channel_id, ticket, kind in ticket_sla.due(guild.id, now, cfg):
+            ch = guild.get_channel(channel_id)
+            if ch is None:
+                forget_ticket(bot, channel_id)
                 continue
-            for ch in cat.channels:
-                if not isinstance(ch, discord.TextChannel):
-                    continue
-                if not ch.topic or 'user:' not in ch.topic:
-                    continue
-                try:
-                    async for msg in ch.history(limit=50):
-                        if not msg.author.bot:
-                            staff_responded = any(r.id in cfg.get('support_role_ids', []) for r in msg.author.roles) if hasattr(msg.author, 'roles') else False
-                            if staff_responded:
-                                break
-                    else:
-                        created_delta = (_utcnow() - ch.created_at).total_seconds() / 60
-                        # Detectar prioridade no tópico
-                        priority = None
-                        if 'priority:' in ch.topic:
-                            try:
-                                priority = ch.topic.split('priority:')[1].split()[0].upper()
-                            except (IndexError, AttributeError):
-                                priority = None
-                        threshold = None
-                        if sla_map and priority:
-                            threshold = sla_map.get(priority)
-                        elif legacy_sla:
-                            threshold = legacy_sla
-                        if threshold and created_delta >= threshold and alert_roles:
-                            mention = ' '.join([f'<@&{rid}>' for rid in alert_roles])
-                            await ch.send(f'🚨 SLA excedido ({priority or "PADRÃO"}) após {int(created_delta)} min! {mention}')
-                        if escalation_min and created_delta >= escalation_min and escalation_roles:
-                            mention_esc = ' '.join([f'<@&{rid}>' for rid in escalation_roles])
-                            await ch.send(f'⚠️ Escalonamento! {mention_esc}')
-                except Exception:
-                    pass
+            try:
+                if kind == ALERT:
+                    mention = ' '.join([f'<@&{rid}>' for rid in cfg.get('sla_alert_role_ids', [])])
+                    elapsed = (now - ticket['opened_at']) / 60
+                    await ch.send(f'🚨 SLA excedido ({ticket.get("priority") or "PADRÃO"}) após {int(elapsed)} min! {mention}')
+                else:
+                    mention_esc = ' '.join([f'<@&{rid}>' for rid in cfg.get('escalation_role_ids', [])])
+                    await ch.send(f'⚠️ Escalonamento! {mention_esc}')
+            except Exception:
+                pass
+    ticket_sla.flush()
+
+@tasks.loop(minutes=10)
+async def compact_journals_task():
+    """Compacta os diários de economia e inventário fora do event loop."""
+    loop = asyncio.get_event_loop()
+    # Presas: o LRU não fecha uma partição no meio da compactação
+    with economy.pinned() as partitions:
+        for store in [*partitions, inventory]:
+            if not store.journal.pending:
+                continue
+            try:
+                await loop.run_in_executor(None, store.compact)
+            except Exception as e:
+                print(f"  [ERRO] Falha ao compactar diario: {e}")
+
+@tasks.loop(minutes=1)
+async def transcript_flush_task():
+    """Grava em disco as linhas pendentes dos transcripts ao vivo."""
+    try:
+        await asyncio.get_event_loop().run_in_executor(None, ticket_transcripts.flush)
+    except Exception as e:
+        print(f"  [ERRO] Falha ao gravar transcripts: {e}")
+
+@tasks.loop(minutes=5)
+async def spam_sweep_task():
+    """Descarta janelas anti-spam de usuários que pararam de falar."""
+    spam_tracker.sweep(asyncio.get_event_loop().time())
 
 @bot.event
 async def on_ready():
@@ -567,94 +617,95 @@ async def on_ready():
     print(f"  Latencia: {round(bot.latency * 1000)}ms")
     print("="*60)
 
-    # Inicializar cache auxiliar para anti-spam
-    global _recent_messages
-    _recent_messages = {}
+    # Migrar a economia global antiga para partições por servidor (uma única vez)
+    if economy.needs_migration():
+        try:
+            memberships = {}
+            for guild in bot.guilds:
+                for member in guild.members:
+                    memberships.setdefault(member.id, []).append(guild.id)
+            migrated = await asyncio.get_running_loop().run_in_executor(
+                None, economy.migrate_global, memberships, ECONOMY_MIGRATION_POLICY)
+            print(f"  [OK] Economia migrada para {len(migrated)} servidor(es) (politica: {ECONOMY_MIGRATION_POLICY})")
+        except Exception as e:
+            print(f"  [ERRO] Falha na migracao da economia: {e}")
+
+    # Reiniciar janelas do anti-spam
+    spam_tracker.clear()
+
+    # Tickets abertos enquanto o bot estava fora entram nos índices de atividade e SLA
+    await _seed_ticket_indexes()
 
     # Iniciar tasks loops
     auto_close_tickets_task.start()
     sla_check_task.start()
+    if not compact_journals_task.is_running():
+        compact_journals_task.start()
+    if not spam_sweep_task.is_running():
+        spam_sweep_task.start()
+    if not transcript_flush_task.is_running():
+        transcript_flush_task.start()
 
 
 # ==================== EVENTOS AUTOROLE / REACTIONS ====================
 
-def _match_emoji(stored: str, payload_emoji) -> bool:
-    """Tenta casar o emoji configurado com o do payload.
-    stored pode ser unicode (ex: 😀) ou formato custom (<:nome:id> ou :nome:id).
-    """
-    try:
-        if payload_emoji.is_custom_emoji():
-            # Formato padrão armazenado deve ser <a:name:id> ou <:name:id>
-            expected = f"<{'a' if payload_emoji.animated else ''}:{payload_emoji.name}:{payload_emoji.id}>"
-            return stored == expected
-        return stored == str(payload_emoji)
-    except Exception:
-        return False
+# Reaction roles indexados por (mensagem, emoji); refeitos só quando a config muda
+reaction_roles = ReactionRoleIndex(panel_config)
 
 
 @bot.event
 async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
     if payload.guild_id is None or payload.member is None:
         return
+    index = reaction_roles.for_guild(payload.guild_id)
+    rr = index.lookup(payload.message_id, payload.channel_id, payload.emoji)
+    if rr is None:
+        return
     guild = bot.get_guild(payload.guild_id)
     if guild is None:
         return
-    autorole_cfg = panel_config.get_guild_config(guild.id, 'autorole')
-    if not autorole_cfg.get('enabled'):
-        return
-    rr_list = autorole_cfg.get('reaction_roles', [])
-    if not rr_list:
+    role = guild.get_role(rr.get('role_id'))
+    if role is None:
         return
-    for rr in rr_list:
-        if rr.get('message_id') == payload.message_id and rr.get('channel_id') == payload.channel_id and _match_emoji(rr.get('emoji', ''), payload.emoji):
-            role = guild.get_role(rr.get('role_id'))
-            if role is None:
-                continue
-            member = payload.member
-            try:
-                if role not in member.roles:
-                    await member.add_roles(role, reason='Reaction Role')
-                # Se for único, remover outros únicos desse mesmo message
-                if rr.get('unique'):
-                    for other in rr_list:
-                        if other is rr:
-                            continue
-                        if other.get('unique') and other.get('message_id') == rr.get('message_id'):
-                            other_role = guild.get_role(other.get('role_id'))
-                            if other_role and other_role in member.roles and other_role != role:
-                                await member.remove_roles(other_role, reason='Reaction Role (grupo único)')
-            except Exception:
-                pass
-            break
+    member = payload.member
+    try:
+        if role not in member.roles:
+            await member.add_roles(role, reason='Reaction Role')
+        # Se for único, remover outros únicos desse mesmo message
+        if rr.get('unique'):
+            for other in index.unique.get(payload.message_id, ()):
+                if other is rr:
+                    continue
+                other_role = guild.get_role(other.get('role_id'))
+                if other_role and other_role in member.roles and other_role != role:
+                    await member.remove_roles(other_role, reason='Reaction Role (grupo único)')
+    except Exception:
+        pass
 
 
 @bot.event
 async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
     if payload.guild_id is None:
         return
+    rr = reaction_roles.for_guild(payload.guild_id).lookup(payload.message_id, payload.channel_id, payload.emoji)
+    if rr is None:
+        return
     guild = bot.get_guild(payload.guild_id)
     if guild is None:
         return
-    autorole_cfg = panel_config.get_guild_config(guild.id, 'autorole')
-    if not autorole_cfg.get('enabled'):
-        return
-    rr_list = autorole_cfg.get('reaction_roles', [])
-    if not rr_list:
+    role = guild.get_role(rr.get('role_id'))
+    if role is None:
         return
     # Buscar membro (não vem pronto no remove)
     try:
         member = await guild.fetch_member(payload.user_id)
     except Exception:
         return
-    for rr in rr_list:
-        if rr.get('message_id') == payload.message_id and rr.get('channel_id') == payload.channel_id and _match_emoji(rr.get('emoji', ''), payload.emoji):
-            role = guild.get_role(rr.get('role_id'))
-            if role and role in member.roles:
-                try:
-                    await member.remove_roles(role, reason='Reaction Role removido')
-                except Exception:
-                    pass
-            break
+    if role in member.roles:
+        try:
+            await member.remove_roles(role, reason='Reaction Role removido')
+        except Exception:
+            pass
 
 @bot.event
 async def on_member_update(before: discord.Member, after: discord.Member):
@@ -664,20 +715,12 @@ async def on_member_update(before: discord.Member, after: discord.Member):
     removed_roles = set(before.roles) - set(after.roles)
     if not removed_roles:
         return
-    autorole_cfg = panel_config.get_guild_config(before.guild.id, 'autorole')
-    if not autorole_cfg.get('enabled'):
+    index = reaction_roles.for_guild(before.guild.id)
+    if not index.enabled:
         return
-    rr_list = autorole_cfg.get('reaction_roles', [])
-    if not rr_list:
-        return
-    # Map role_id -> reaction role entries
-    role_map = {}
-    for rr in rr_list:
-        role_map.setdefault(rr.get('role_id'), []).append(rr)
     targets = []
     for r in removed_roles:
-        if r.id in role_map:
-            targets.extend(role_map[r.id])
+        targets.extend(index.by_role.get(r.id, ()))
     if not targets:
         return
     for rr in targets:
@@ -891,18 +934,17 @@ async def daily(interaction: discord.Interaction):
     color = econ_cfg.get("daily_color", 0x00FF00)
 
     user_id = interaction.user.id
-    async with economia_lock:
-        if user_id not in economia:
-            economia[user_id] = 0
-        economia[user_id] += amount
-        await save_economia(economia)
+    gid = interaction.guild.id
+    async with economy_locks.hold((gid, user_id)):
+        store = await economy.fetch(gid)
+        novo_saldo = store.credit(user_id, amount)
 
     view = make_card(
         title="Daily coletado",
         description=f"Voce ganhou **{amount} creditos**.",
         color=color,
         fields=[
-            ("Saldo atual", f"**{economia[user_id]:,}** créditos"),
+            ("Saldo atual", f"**{novo_saldo:,}** créditos"),
         ],
         thumbnail_url=interaction.user.display_avatar.url,
         author_id=interaction.user.id,
@@ -915,7 +957,8 @@ async def saldo(interaction: discord.Interaction):
     econ_cfg = panel_config.get_guild_config(interaction.guild.id, "economy")
     color = econ_cfg.get("saldo_color", 0xFFD700)
     user_id = interaction.user.id
-    saldo_valor = economia.get(user_id, 0)
+    store = await economy.fetch(interaction.guild.id)
+    saldo_valor = store.get_balance(user_id)
     view = make_card(
         title="Seu saldo",
         description=f"Você tem: **{saldo_valor:,} créditos**",
@@ -943,19 +986,13 @@ async def transferir(interaction: discord.Interaction, member: discord.Member, a
         await interaction.response.send_message(view=make_error("Você não pode transferir para si mesmo."), ephemeral=True)
         return
 
-    async with economia_lock:
-        if sender_id not in economia:
-            economia[sender_id] = 0
-        if receiver_id not in economia:
-            economia[receiver_id] = 0
-
-        if economia[sender_id] < amount:
-            await interaction.response.send_message(view=make_error(insufficient_msg), ephemeral=True)
-            return
-
-        economia[sender_id] -= amount
-        economia[receiver_id] += amount
-        await save_economia(economia)
+    gid = interaction.guild.id
+    async with economy_locks.hold((gid, sender_id), (gid, receiver_id)):
+        store = await economy.fetch(gid)
+        saldo_restante = store.transfer(sender_id, receiver_id, amount)
+    if saldo_restante is None:
+        await interaction.response.send_message(view=make_error(insufficient_msg), ephemeral=True)
+        return
 
     color = econ_cfg.get("saldo_color", 0xFFD700)
     view = make_card(
@@ -967,20 +1004,23 @@ async def transferir(interaction: discord.Interaction, member: discord.Member, a
     await interaction.response.send_message(view=view)
 
 @tree.command(name="top", description="Exibe ranking de maiores saldos")
-async def top(interaction: discord.Interaction):
-    if not economia:
+@app_commands.describe(pagina="Página do ranking (10 por página)")
+async def top(interaction: discord.Interaction, pagina: app_commands.Range[int, 1, 10000] = 1):
+    offset = (pagina - 1) * 10
+    store = await economy.fetch(interaction.guild.id)
+    sorted_users = store.top(10, offset)
+    if not sorted_users:
         await interaction.response.send_message(view=make_error("Nenhum dado de economia."), ephemeral=True)
         return
-    sorted_users = sorted(economia.items(), key=lambda x: x[1], reverse=True)[:10]
     medals = {1: "🥇", 2: "🥈", 3: "🥉"}
     lines = []
-    for i, (uid, value) in enumerate(sorted_users, start=1):
+    for i, (uid, value) in enumerate(sorted_users, start=offset + 1):
         member = interaction.guild.get_member(uid)
         name = member.display_name if member else f"ID:{uid}"
         medal = medals.get(i, f"**{i}.**")
         lines.append(f"{medal} {name} — **{value:,}** créditos")
     view = make_card(
-        title="Ranking de saldos",
+        title="Ranking de saldos" if pagina == 1 else f"Ranking de saldos — página {pagina}",
         description="\n".join(lines),
         color=0xFFD700,
     )
@@ -1026,24 +1066,21 @@ async def buy(interaction: discord.Interaction, item: str):
     buy_msg = econ_cfg.get("buy_success_message", "Voce comprou **{item}** por {price} {currency}.")
     currency = econ_cfg.get('shop_currency_name','créditos')
     emoji = econ_cfg.get('currency_emoji', '💳')
-    async with economia_lock:
-        saldo = economia.get(user_id,0)
-        if saldo < target['price']:
-            await interaction.response.send_message(insufficient_msg, ephemeral=True)
-            return
-        economia[user_id] = saldo - target['price']
-        await save_economia(economia)
-    async with inventory_lock:
-        inv_user = inventory.get(str(user_id), [])
-        inv_user.append(target['name'])
-        inventory[str(user_id)] = inv_user
-        await save_inventory(inventory)
+    gid = interaction.guild.id
+    async with economy_locks.hold((gid, user_id)):
+        store = await economy.fetch(gid)
+        comprado = store.debit(user_id, target['price'], motivo='compra') is not None
+        if comprado:
+            inventory.add_item(user_id, target['name'], target['price'])
+    if not comprado:
+        await interaction.response.send_message(insufficient_msg, ephemeral=True)
+        return
     view = make_success(buy_msg.format(item=target['name'], price=target['price'], currency=currency, emoji=emoji), author_id=interaction.user.id)
     await interaction.response.send_message(view=view, ephemeral=True)
 
 @tree.command(name="inventory", description="Mostra seus itens comprados")
 async def inventory_cmd(interaction: discord.Interaction):
-    inv_user = inventory.get(str(interaction.user.id), [])
+    inv_user = inventory.get_items(interaction.user.id)
     if not inv_user:
         await interaction.response.send_message("Inventário vazio.", ephemeral=True)
         return
@@ -1101,14 +1138,12 @@ async def trabalhar(interaction: discord.Interaction):
             multiplier = max(multiplier, mult)
     ganho = int(ganho * multiplier)
 
-    async with economia_lock:
-        user_id = interaction.user.id
-        if user_id not in economia:
-            economia[user_id] = 0
-        economia[user_id] += ganho
-        await save_economia(economia)
+    gid = interaction.guild.id
+    async with economy_locks.hold((gid, interaction.user.id)):
+        store = await economy.fetch(gid)
+        novo_saldo = store.credit(interaction.user.id, ganho)
 
-    fields = [("Saldo atual", f"{economia.get(interaction.user.id, 0)} créditos")]
+    fields = [("Saldo atual", f"{novo_saldo} créditos")]
     if multiplier > 1:
         fields.insert(0, ("Bonus de cargo", f"Multiplicador: {multiplier}x"))
     view = make_card(
@@ -1137,51 +1172,46 @@ async def roubar(interaction: discord.Interaction, member: discord.Member):
     roubo_max_percent = econ_cfg.get("rob_max_percent", 30)
     roubo_penalty_percent = econ_cfg.get("rob_penalty_percent", 20)
 
-    async with economia_lock:
-        sender_id = interaction.user.id
-        target_id = member.id
-        if sender_id not in economia:
-            economia[sender_id] = 0
-        if target_id not in economia:
-            economia[target_id] = 0
-
-        target_saldo = economia[target_id]
+    sender_id = interaction.user.id
+    target_id = member.id
+    erro = None
+    gid = interaction.guild.id
+    async with economy_locks.hold((gid, sender_id), (gid, target_id)):
+        store = await economy.fetch(gid)
+        target_saldo = store.get_balance(target_id)
+        sender_saldo = store.get_balance(sender_id)
         if target_saldo < 50:
-            await interaction.response.send_message("Esse membro nao tem creditos suficientes para roubar.", ephemeral=True)
-            return
-
-        if economia[sender_id] < 50:
-            await interaction.response.send_message("Voce precisa de pelo menos 50 creditos para tentar roubar.", ephemeral=True)
-            return
-
-        sucesso = random.randint(1, 100) <= roubo_chance
-
-        if sucesso:
+            erro = "Esse membro nao tem creditos suficientes para roubar."
+        elif sender_saldo < 50:
+            erro = "Voce precisa de pelo menos 50 creditos para tentar roubar."
+        elif random.randint(1, 100) <= roubo_chance:
             max_roubo = int(target_saldo * roubo_max_percent / 100)
             roubado = random.randint(1, max(1, max_roubo))
-            economia[sender_id] += roubado
-            economia[target_id] -= roubado
-            await save_economia(economia)
-
-            result_view = make_card(
-                title="Roubo bem-sucedido",
-                description=f"Voce roubou **{roubado} creditos** de {member.mention}.",
-                color=0x00FF00,
-                author_id=interaction.user.id,
-            )
+            store.transfer(target_id, sender_id, roubado)
+            multa = None
         else:
-            multa = int(economia[sender_id] * roubo_penalty_percent / 100)
+            multa = int(sender_saldo * roubo_penalty_percent / 100)
             multa = max(multa, 10)
-            economia[sender_id] -= multa
-            await save_economia(economia)
+            store.debit(sender_id, multa, allow_negative=True)
 
-            motivo = random.choice(FRACASSOS_ROUBO)
-            result_view = make_card(
-                title="Roubo falhou",
-                description=f"{motivo}\nVoce perdeu **{multa} creditos** de multa.",
-                color=0xFF0000,
-                author_id=interaction.user.id,
-            )
+    if erro:
+        await interaction.response.send_message(erro, ephemeral=True)
+        return
+    if multa is None:
+        result_view = make_card(
+            title="Roubo bem-sucedido",
+            description=f"Voce roubou **{roubado} creditos** de {member.mention}.",
+            color=0x00FF00,
+            author_id=interaction.user.id,
+        )
+    else:
+        motivo = random.choice(FRACASSOS_ROUBO)
+        result_view = make_card(
+            title="Roubo falhou",
+            description=f"{motivo}\nVoce perdeu **{multa} creditos** de multa.",
+            color=0xFF0000,
+            author_id=interaction.user.id,
+        )
 
     await interaction.response.send_message(view=result_view)
 
@@ -1197,34 +1227,36 @@ async def coinflip(interaction: discord.Interaction, valor: int):
         await interaction.response.send_message("Valor deve ser maior que 0.", ephemeral=True)
         return
 
-    async with economia_lock:
-        user_id = interaction.user.id
-        if user_id not in economia:
-            economia[user_id] = 0
-        if economia[user_id] < valor:
-            await interaction.response.send_message("Saldo insuficiente.", ephemeral=True)
-            return
-
-        resultado = random.choice(["cara", "coroa"])
-        ganhou = random.choice([True, False])
-
-        if ganhou:
-            economia[user_id] += valor
-            result_view = make_card(
-                title=f"{resultado.capitalize()}",
-                description=f"Voce ganhou **{valor} creditos**.\nSaldo: {economia[user_id]}",
-                color=0x00FF00,
-                author_id=interaction.user.id,
-            )
+    user_id = interaction.user.id
+    resultado = random.choice(["cara", "coroa"])
+    ganhou = random.choice([True, False])
+    gid = interaction.guild.id
+    async with economy_locks.hold((gid, user_id)):
+        store = await economy.fetch(gid)
+        if store.get_balance(user_id) < valor:
+            novo_saldo = None
+        elif ganhou:
+            novo_saldo = store.credit(user_id, valor)
         else:
-            economia[user_id] -= valor
-            result_view = make_card(
-                title=f"{resultado.capitalize()}",
-                description=f"Voce perdeu **{valor} creditos**.\nSaldo: {economia[user_id]}",
-                color=0xFF0000,
-                author_id=interaction.user.id,
-            )
-        await save_economia(economia)
+            novo_saldo = store.debit(user_id, valor)
+    if novo_saldo is None:
+        await interaction.response.send_message("Saldo insuficiente.", ephemeral=True)
+        return
+
+    if ganhou:
+        result_view = make_card(
+            title=f"{resultado.capitalize()}",
+            description=f"Voce ganhou **{valor} creditos**.\nSaldo: {novo_saldo}",
+            color=0x00FF00,
+            author_id=interaction.user.id,
+        )
+    else:
+        result_view = make_card(
+            title=f"{resultado.capitalize()}",
+            description=f"Voce perdeu **{valor} creditos**.\nSaldo: {novo_saldo}",
+            color=0xFF0000,
+            author_id=interaction.user.id,
+        )
 
     await interaction.response.send_message(view=result_view)
 
@@ -1241,46 +1273,49 @@ async def roleta(interaction: discord.Interaction, valor: int, cor: app_commands
         await interaction.response.send_message("Valor deve ser maior que 0.", ephemeral=True)
         return
 
-    async with economia_lock:
-        user_id = interaction.user.id
-        if user_id not in economia:
-            economia[user_id] = 0
-        if economia[user_id] < valor:
-            await interaction.response.send_message("Saldo insuficiente.", ephemeral=True)
-            return
-
-        # Resultado: 48.6% vermelho, 48.6% preto, 2.7% verde
-        roll = random.randint(0, 36)
-        if roll == 0:
-            resultado = "verde"
-            emoji_resultado = "🟢"
-        elif roll % 2 == 0:
-            resultado = "vermelho"
-            emoji_resultado = "🔴"
-        else:
-            resultado = "preto"
-            emoji_resultado = "⚫"
-
-        cor_escolhida = cor.value
-        if cor_escolhida == resultado:
-            multi = 14 if resultado == "verde" else 2
-            ganho = valor * multi
-            economia[user_id] += ganho - valor  # já apostou o valor
-            result_view = make_card(
-                title=f"{emoji_resultado} {resultado.capitalize()}",
-                description=f"Voce apostou {cor_escolhida} e ganhou **{ganho} creditos** ({multi}x).\nSaldo: {economia[user_id]}",
-                color=0x00FF00,
-                author_id=interaction.user.id,
-            )
+    user_id = interaction.user.id
+    # Resultado: 48.6% vermelho, 48.6% preto, 2.7% verde
+    roll = random.randint(0, 36)
+    if roll == 0:
+        resultado = "verde"
+        emoji_resultado = "🟢"
+    elif roll % 2 == 0:
+        resultado = "vermelho"
+        emoji_resultado = "🔴"
+    else:
+        resultado = "preto"
+        emoji_resultado = "⚫"
+
+    cor_escolhida = cor.value
+    multi = 14 if resultado == "verde" else 2
+    ganho = valor * multi
+    gid = interaction.guild.id
+    async with economy_locks.hold((gid, user_id)):
+        store = await economy.fetch(gid)
+        if store.get_balance(user_id) < valor:
+            novo_saldo = None
+        elif cor_escolhida == resultado:
+            novo_saldo = store.credit(user_id, ganho - valor)  # já apostou o valor
         else:
-            economia[user_id] -= valor
-            result_view = make_card(
-                title=f"{emoji_resultado} {resultado.capitalize()}",
-                description=f"Voce apostou {cor_escolhida} mas saiu {resultado}. Perdeu **{valor} creditos**.\nSaldo: {economia[user_id]}",
-                color=0xFF0000,
-                author_id=interaction.user.id,
-            )
-        await save_economia(economia)
+            novo_saldo = store.debit(user_id, valor)
+    if novo_saldo is None:
+        await interaction.response.send_message("Saldo insuficiente.", ephemeral=True)
+        return
+
+    if cor_escolhida == resultado:
+        result_view = make_card(
+            title=f"{emoji_resultado} {resultado.capitalize()}",
+            description=f"Voce apostou {cor_escolhida} e ganhou **{ganho} creditos** ({multi}x).\nSaldo: {novo_saldo}",
+            color=0x00FF00,
+            author_id=interaction.user.id,
+        )
+    else:
+        result_view = make_card(
+            title=f"{emoji_resultado} {resultado.capitalize()}",
+            description=f"Voce apostou {cor_escolhida} mas saiu {resultado}. Perdeu **{valor} creditos**.\nSaldo: {novo_saldo}",
+            color=0xFF0000,
+            author_id=interaction.user.id,
+        )
 
     await interaction.response.send_message(view=result_view)
 
@@ -1614,7 +1649,13 @@ async def metricas(interaction: discord.Interaction):
     avg_feedback = 0
     if feedback_store:
         avg_feedback = sum(feedback_store.values())/len(feedback_store)
-    total_credits = sum(economia.values()) if economia else 0
+    econ_store = await economy.fetch(interaction.guild.id)
+    total_credits = econ_store.total_supply()
+    spam_stats = spam_tracker.stats()
+    pipeline_lines = [
+        f"{name}: {avg:.2f} ms (pior {worst:.1f} ms)" + (f", {errors} erro(s)" if errors else "") + (f", {skipped} pulada(s)" if skipped else "")
+        for name, calls, avg, worst, errors, skipped in bot.message_pipeline.stats()
+    ]
     metricas_view = make_card(
         title="Metricas do servidor",
         description="Use /stats para estatisticas detalhadas",
@@ -1622,14 +1663,52 @@ async def metricas(interaction: discord.Interaction):
         fields=[
             ("Tickets", f"Criados: {tickets_cfg.get('ticket_counter',0)}\nFechados: {tickets_cfg.get('closed_counter',0)}"),
             ("Warns", f"Total warns registrados: {sum(warn_store.values())}"),
-            ("Economia", f"Usuários: {len(economia)}\nCréditos totais: {total_credits}"),
+            ("Economia", f"Usuários: {econ_store.count()}\nCréditos totais: {total_credits}"),
             ("Feedback Médio", f"{avg_feedback:.2f}" if feedback_store else "Sem dados"),
+            ("Anti-spam (global)", f"Janelas ativas: {spam_stats['keys']}\nDescartadas (limite): {spam_stats['evictions']}\n"
+                                   f"Ociosas varridas: {spam_stats['swept']}\nMemória: ~{spam_stats['bytes'] // 1024} KB"),
+            ("Pipeline de mensagens (global, tempo de relógio)", f"Mensagens: {bot.message_pipeline.messages} "
+                                               f"(acima do orçamento: {bot.message_pipeline.over_budget})\n" + "\n".join(pipeline_lines)),
         ],
         author_id=interaction.user.id,
     )
     await interaction.response.send_message(view=metricas_view, ephemeral=True)
 
 
+@tree.command(name="ticket-busca", description="Busca nos transcripts de tickets fechados")
+@app_commands.describe(termos="Palavras; filtros opcionais autor:nome|@membro e data:AAAA-MM[-DD]")
+async def ticket_busca(interaction: discord.Interaction, termos: str):
+    tickets_cfg = panel_config.get_guild_config(interaction.guild.id, 'tickets')
+    support = tickets_cfg.get('support_role_ids', [])
+    is_staff = interaction.user.guild_permissions.manage_channels or any(r.id in support for r in interaction.user.roles)
+    if not is_staff:
+        await interaction.response.send_message(view=make_error("Apenas a equipe de suporte pode buscar transcripts."), ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    loop = asyncio.get_event_loop()
+    results = await loop.run_in_executor(None, transcript_archive.search, interaction.guild.id, termos, 5)
+    if not results:
+        await interaction.followup.send(view=make_info("Busca em transcripts", f"Nenhum ticket encontrado para `{termos[:100]}`."), ephemeral=True)
+        return
+    fields = []
+    for r in results:
+        closed = datetime.fromtimestamp(r['fechado_em'], timezone.utc).strftime('%d/%m/%Y')
+        snippet = await loop.run_in_executor(None, transcript_archive.snippet, r['ticket_id'], termos)
+        opener = f"<@{r['opener_id']}>" if r['opener_id'] else "?"
+        lines = [f"ID `{r['ticket_id']}` | aberto por {opener} | fechado em {closed} | {r['mensagens']} msg"]
+        if snippet:
+            lines.append(f"> {snippet}")
+        fields.append((f"#{r['nome']}", "\n".join(lines)[:1024]))
+    view = make_card(
+        title="Busca em transcripts",
+        description=f"`{termos[:100]}` — {len(results)} ticket(s) mais relevantes",
+        color=discord.Color.blurple(),
+        fields=fields,
+        author_id=interaction.user.id,
+    )
+    await interaction.followup.send(view=view, ephemeral=True)
+
+
 # ========== CONFIGURAÇÃO ==========
 
 @tree.command(name="setlog", description="Define o canal de logs de moderação para este servidor")
@@ -1648,62 +1727,88 @@ async def setlog(interaction: discord.Interaction, canal: discord.TextChannel):
 
 # ==================== AUTO-MOD EVENTO ====================
 
-_recent_messages = {}
+# Janelas anti-spam por (guild, usuário): memória limitada, ociosos varridos a cada 5 min
+spam_tracker = SlidingWindowTracker(max_keys=50_000, idle_seconds=600)
+# Regras de auto-mod compiladas por servidor (refeitas só quando a config muda)
+automod = AutoModEngine(panel_config)
 
-@bot.event
-async def on_message(message: discord.Message):
-    if message.author.bot or not message.guild:
+# Pipeline único de mensagens: auto-mod (aqui), XP e estatísticas (registrados nos módulos)
+bot.message_pipeline = MessagePipeline(panel_config)
+
+async def _automod_stage(ctx: MessageContext):
+    message = ctx.message
+    rules = automod.rules_for(ctx.guild_id)
+    if not rules.enabled:
         return
-    mod_cfg = panel_config.get_guild_config(message.guild.id, 'moderation')
-    am = mod_cfg.get('auto_mod', {})
-    if not am.get('enabled'):
-        await bot.process_commands(message)
+    now = asyncio.get_event_loop().time()
+    user_key = (ctx.guild_id, message.author.id)
+    recent = spam_tracker.hit(user_key, now, rules.window, rules.spam_limit)
+    violations = []
+    if recent > rules.spam_limit:
+        violations.append('spam')
+    violations.extend(rules.check_content(message.content or ''))
+    if not violations:
         return
+    deleted = False
     try:
-        now = asyncio.get_event_loop().time()
-        user_key = (message.guild.id, message.author.id)
-        window = am.get('cooldown_seconds',5)
-        spam_limit = am.get('spam_limit',5)
-        lst = _recent_messages.get(user_key, [])
-        lst = [t for t in lst if now - t <= window]
-        lst.append(now)
-        _recent_messages[user_key] = lst
-        violations = []
-        if len(lst) > spam_limit:
-            violations.append('spam')
-        content = message.content or ''
-        letters = [c for c in content if c.isalpha()]
-        caps_ratio = (sum(1 for c in letters if c.isupper())/len(letters)) if letters else 0
-        if caps_ratio >= am.get('caps_threshold',0.7) and len(letters) >= 10:
-            violations.append('caps')
-        if am.get('block_links', True) and ('http://' in content.lower() or 'https://' in content.lower()):
-            violations.append('links')
-        if content.count('@') >= am.get('max_mentions',5):
-            violations.append('mentions')
-        for bad in am.get('blacklist_words', []):
-            if bad.lower() in content.lower():
-                violations.append('blacklist')
-                break
-        if violations:
-            action = am.get('action','delete')
-            try:
-                if action == 'delete':
-                    await message.delete()
-                elif action == 'warn':
-                    await message.reply(f"Sua mensagem violou regras ({', '.join(set(violations))}).", delete_after=10)
-            except Exception:
-                pass
-            # Log opcional
-            log_channel_id = mod_cfg.get('log_channel_id')
-            if log_channel_id:
-                log_ch = message.guild.get_channel(log_channel_id)
-                if log_ch:
-                    log_embed = discord.Embed(title='Auto-Mod', description=f"Autor: {message.author.mention}\nViolações: {', '.join(set(violations))}", color=discord.Color.red(), timestamp=_utcnow())
-                    log_embed = _style_embed(message.guild, log_embed)
-                    try: await log_ch.send(embed=log_embed)
-                    except Exception: pass
+        if rules.action == 'delete':
+            await message.delete()
+            deleted = True
+        elif rules.action == 'warn':
+            await message.reply(f"Sua mensagem violou regras ({', '.join(set(violations))}).", delete_after=10)
     except Exception:
         pass
+    # Log opcional
+    log_channel_id = ctx.config('moderation').get('log_channel_id')
+    if log_channel_id:
+        log_ch = message.guild.get_channel(log_channel_id)
+        if log_ch:
+            log_embed = discord.Embed(title='Auto-Mod', description=f"Autor: {message.author.mention}\nViolações: {', '.join(set(violations))}", color=discord.Color.red(), timestamp=_utcnow())
+            log_embed = _style_embed(message.guild, log_embed)
+            try: await log_ch.send(embed=log_embed)
+            except Exception: pass
+    # Mensagem apagada não rende XP nem conta nas estatísticas
+    if deleted:
+        return STOP
+
+bot.message_pipeline.register('automod', _automod_stage, order=MessagePipeline.AUTOMOD)
+
+# Registro de tickets (dono/prioridade/claim), última atividade (auto-close)
+# e estado de SLA: nada disso lê tópico nem histórico dos canais
+ticket_registry = TicketRegistry()
+bot.ticket_registry = ticket_registry
+ticket_transcripts = TranscriptStore()
+bot.ticket_transcripts = ticket_transcripts
+transcript_archive = TranscriptArchive()
+bot.transcript_archive = transcript_archive
+ticket_activity = TicketActivityTracker()
+bot.ticket_activity = ticket_activity
+ticket_sla = TicketSLA(panel_config)
+bot.ticket_sla = ticket_sla
+
+async def _ticket_stage(ctx: MessageContext):
+    channel_id = ctx.message.channel.id
+    if channel_id not in ticket_activity and channel_id not in ticket_sla:
+        return
+    ts = ctx.message.created_at.timestamp()
+    ticket_activity.touch(ctx.guild_id, channel_id, ts)
+    ticket_sla.on_message(channel_id, ctx.message.author, ts, ctx.config('tickets'))
+
+bot.message_pipeline.register('tickets', _ticket_stage, order=MessagePipeline.TICKETS)
+
+@bot.event
+async def on_message(message: discord.Message):
+    # Transcript ao vivo: inclui mensagens de bots, por isso vem antes do filtro
+    if message.guild and message.channel.id in ticket_registry:
+        if panel_config.get_guild_config(message.guild.id, 'tickets').get('transcript_enabled'):
+            ticket_transcripts.append(message.channel.id, message)
+    # Mensagens do bot (ex.: lembrete de SLA, staff postando pelo bot) também
+    # contam como atividade do ticket; as dos membros passam pelo pipeline
+    if message.author.bot and message.guild and message.channel.id in ticket_activity:
+        ticket_activity.touch(message.guild.id, message.channel.id, message.created_at.timestamp())
+    if message.author.bot or not message.guild:
+        return
+    await bot.message_pipeline.dispatch(message)
     await bot.process_commands(message)
 
 
@@ -1765,4 +1870,15 @@ except Exception as e:
     print(f"\n  [ERRO] Erro ao iniciar o bot: {e}")
     print("   Verifique sua conexão com a internet e tente novamente.\n")
     sys.exit(1)
+finally:
+    # XP acumulado no último tick (sem avisos: o loop já parou) e leveling
+    xp_aggregator = getattr(bot, 'xp_aggregator', None)
+    if xp_aggregator is not None:
+        xp_aggregator.tick(notify=False)
+        xp_aggregator.leveling.flush()
+    # Gravar configurações pendentes (escrita adiada) antes de sair
+    panel_config.flush()
+    ticket_activity.flush()
+    ticket_sla.flush()
+    ticket_transcripts.flush()
 
@@ -0,0 +1,167 @@
+"""
+Fila de Ações com Limite de Taxa (chamadas à API do Discord)
+Desenvolvido por: MARKIZIN
+"""
+import asyncio
+
+
+class TokenBucket:
+    """Balde de fichas compartilhado: no máximo `rate` ações por segundo, com rajada de `burst`.
+
+    `acquire()` reserva a próxima ficha na hora (o saldo pode ficar negativo)
+    e dorme até ela valer, então quem chama primeiro sai primeiro.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = burst
+        self._updated = None
+
+    async def acquire(self):
+        now = asyncio.get_running_loop().time()
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class RateLimitedQueue:
+    """Executa corrotinas em ordem, no máximo `rate` por segundo.
+
+    A fila é limitada: se encher (ex.: uma enxurrada de level-ups), novas
+    ações são descartadas, contadas em `dropped` e avisadas no log (a
+    primeira e depois a cada `LOG_EVERY`) em vez de acumular memória ou
+    estourar o rate limit da API.
+
+    O worker nasce no primeiro `put()` com o loop rodando e termina quando
+    a fila esvazia; o ritmo continua valendo entre um worker e o próximo.
+    Com `bucket`, cada ação também espera uma ficha do balde compartilhado.
+    """
+
+    LOG_EVERY = 100
+
+    def __init__(self, rate: float = 5.0, max_pending: int = 1000, name: str = "acoes",
+                 bucket: TokenBucket | None = None):
+        self.interval = 1.0 / rate
+        self.name = name
+        self.bucket = bucket
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._worker: asyncio.Task | None = None
+        self._next_slot = 0.0
+        self.done = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def put(self, factory) -> bool:
+        """Enfileira `factory` (função sem argumentos que retorna uma corrotina)."""
+        try:
+            self._queue.put_nowait(factory)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % self.LOG_EVERY == 0:
+                print(f"  [AVISO] Fila '{self.name}' cheia: {self.dropped} acao(oes) descartada(s) ate agora")
+            return False
+        self.start()
+        return True
+
+    def start(self):
+        """Inicia o worker se houver loop rodando (sem loop, as ações só ficam na fila)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if (self._worker is None or self._worker.done()) and not self._queue.empty():
+            self._worker = loop.create_task(self._run())
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    @property
+    def idle(self) -> bool:
+        return self._queue.empty() and (self._worker is None or self._worker.done())
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._queue.empty():
+            factory = self._queue.get_nowait()
+            delay = self._next_slot - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            self._next_slot = max(self._next_slot, loop.time()) + self.interval
+            try:
+                await factory()
+                self.done += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"  [ERRO] Fila '{self.name}': {e}")
+
+
+class KeyedRateLimitedQueue:
+    """Uma `RateLimitedQueue` por chave (ex.: guild_id), criada sob demanda.
+
+    O limite de taxa e o teto de pendentes valem por chave: um servidor
+    com uma enxurrada de level-ups não atrasa nem descarta os dos outros.
+    Com `global_rate`, todas as filas dividem um `TokenBucket`, então o
+    total não cresce com o número de chaves ativas; como cada worker
+    reserva uma ficha por vez, as chaves se revezam no balde.
+    Filas ociosas são descartadas a cada `SWEEP_EVERY` inserções.
+    """
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, rate: float = 5.0, max_pending: int = 200, name: str = "acoes",
+                 global_rate: float | None = None):
+        self.rate = rate
+        self.max_pending = max_pending
+        self.name = name
+        self.bucket = TokenBucket(global_rate) if global_rate else None
+        self._queues: dict = {}
+        self._puts = 0
+        self._retired = {"done": 0, "dropped": 0, "errors": 0}
+
+    def put(self, key, factory) -> bool:
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = RateLimitedQueue(self.rate, self.max_pending, f"{self.name}:{key}", self.bucket)
+        self._puts += 1
+        if self._puts % self.SWEEP_EVERY == 0:
+            self._sweep(keep=key)
+        return queue.put(factory)
+
+    def _sweep(self, keep=None):
+        for key in [k for k, q in self._queues.items() if k != keep and q.idle]:
+            queue = self._queues.pop(key)
+            for attr in self._retired:
+                self._retired[attr] += getattr(queue, attr)
+
+    def _total(self, attr: str) -> int:
+        return self._retired[attr] + sum(getattr(q, attr) for q in self._queues.values())
+
+    @property
+    def done(self) -> int:
+        return self._total("done")
+
+    @property
+    def dropped(self) -> int:
+        return self._total("dropped")
+
+    @property
+    def errors(self) -> int:
+        return self._total("errors")
+
+    def stop(self):
+        for queue in self._queues.values():
+            queue.stop()
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._queues.values())
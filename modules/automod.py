@@ -0,0 +1,130 @@
+"""
+Motor de Auto-Moderação: regras compiladas por servidor
+Desenvolvido por: MARKIZIN
+
+A blacklist inteira vira um único autômato Aho-Corasick, então o custo por
+mensagem depende só do tamanho da mensagem, não do número de palavras.
+As regras compiladas ficam em cache e só são refeitas quando a revisão do
+módulo `moderation` muda no ConfigManager.
+"""
+import re
+from collections import deque
+
+LINK_RE = re.compile(r"https?://", re.IGNORECASE)
+INVITE_RE = re.compile(r"(?:discord(?:app)?\.com/invite|discord\.gg)/[\w-]+", re.IGNORECASE)
+
+
+class AhoCorasick:
+    """Autômato multi-padrão: `search(texto)` diz se alguma palavra aparece."""
+
+    __slots__ = ("_goto", "_fail", "_out", "size")
+
+    def __init__(self, words):
+        goto = [{}]
+        out = [False]
+        self.size = 0
+        for word in words:
+            if not word:
+                continue
+            self.size += 1
+            node = 0
+            for ch in word:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append(False)
+                node = nxt
+            out[node] = True
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                out[nxt] = out[nxt] or out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def search(self, text: str) -> bool:
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                return True
+        return False
+
+
+class CompiledAutoMod:
+    """Regras de `moderation.auto_mod` de um servidor, prontas para uso."""
+
+    __slots__ = ("enabled", "spam_limit", "window", "caps_threshold", "block_links",
+                 "max_mentions", "action", "blacklist")
+
+    def __init__(self, am: dict):
+        self.enabled = bool(am.get("enabled"))
+        self.spam_limit = am.get("spam_limit", 5)
+        self.window = am.get("cooldown_seconds", 5)
+        self.caps_threshold = am.get("caps_threshold", 0.7)
+        self.block_links = am.get("block_links", True)
+        self.max_mentions = am.get("max_mentions", 5)
+        self.action = am.get("action", "delete")
+        words = {str(w).lower() for w in am.get("blacklist_words", []) if w}
+        self.blacklist = AhoCorasick(words) if words else None
+
+    def check_content(self, content: str) -> list:
+        """Violações de conteúdo (caps, links, mentions, blacklist); spam fica a cargo de quem chama."""
+        violations = []
+        if not content:
+            return violations
+        # Uma passada só para letras, maiúsculas e menções
+        letters = uppers = mentions = 0
+        for ch in content:
+            if ch.isalpha():
+                letters += 1
+                if ch.isupper():
+                    uppers += 1
+            elif ch == "@":
+                mentions += 1
+        if letters >= 10 and uppers / letters >= self.caps_threshold:
+            violations.append("caps")
+        if self.block_links and (LINK_RE.search(content) or INVITE_RE.search(content)):
+            violations.append("links")
+        if mentions >= self.max_mentions:
+            violations.append("mentions")
+        if self.blacklist is not None and self.blacklist.search(content.lower()):
+            violations.append("blacklist")
+        return violations
+
+
+class AutoModEngine:
+    """Cache de `CompiledAutoMod` por servidor, invalidado pela revisão da config."""
+
+    MODULE = "moderation"
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self._cache: dict = {}
+
+    def rules_for(self, guild_id: int) -> CompiledAutoMod:
+        revision = self.config_manager.revision(guild_id, self.MODULE)
+        cached = self._cache.get(guild_id)
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        am = self.config_manager.get_guild_config(guild_id, self.MODULE).get("auto_mod", {})
+        rules = CompiledAutoMod(am)
+        self._cache[guild_id] = (revision, rules)
+        return rules
+
+    def forget(self, guild_id: int):
+        self._cache.pop(guild_id, None)
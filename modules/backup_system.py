@@ -5,7 +5,7 @@ Desenvolvido por: MARKIZIN
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
+from modules.serialization import read_file, write_file
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -44,25 +44,24 @@ class BackupSystem:
                 backup_data["configs"][module] = {}
         
         # Salvar backup
-        with open(backup_path, 'w', encoding='utf-8') as f:
-            json.dump(backup_data, f, indent=2, ensure_ascii=False)
+        write_file(backup_path, backup_data, pretty=True)
         
         return str(backup_path)
     
     def restore_backup(self, guild_id: int, backup_file: str) -> bool:
         """Restaura configurações de um arquivo de backup."""
         try:
-            with open(backup_file, 'r', encoding='utf-8') as f:
-                backup_data = json.load(f)
+            backup_data = read_file(backup_file)
             
             # Validar backup
             if backup_data.get("version") != "1.0":
                 return False
             
-            # Restaurar cada módulo
-            for module, config in backup_data.get("configs", {}).items():
-                if config:
-                    self.config_manager.update_guild_config(guild_id, module, config)
+            # Restaurar todos os módulos de uma vez (uma escrita, tudo ou nada)
+            with self.config_manager.batch(guild_id) as cfg:
+                for module, config in backup_data.get("configs", {}).items():
+                    if config:
+                        cfg.update(module, config)
             
             return True
         except Exception as e:
@@ -0,0 +1,76 @@
+"""
+Mapa de Cooldowns com Expiração e Limite de Tamanho
+Desenvolvido por: MARKIZIN
+"""
+import heapq
+import itertools
+import time
+
+
+class CooldownMap:
+    """Cooldowns por chave (ex.: (guild_id, user_id)) com timestamps monotônicos.
+
+    Guarda o instante de expiração de cada chave e um heap de
+    (expiração, chave). Como a duração varia por chave (`xp_cooldown` é
+    por servidor), a ordem de inserção não diz quem expira primeiro; o heap
+    diz. A limpeza só desempilha o que já expirou: O(log n) por chave
+    removida. Entradas antigas de uma chave readquirida ou resetada ficam
+    no heap e são descartadas quando chegam ao topo. Passando de
+    `max_size`, saem as chaves mais perto de expirar — o pior caso é
+    alguém sair do cooldown um pouco antes.
+    """
+
+    def __init__(self, max_size: int = 100_000, clock=time.monotonic):
+        self.max_size = max_size
+        self._clock = clock
+        self._expires: dict = {}
+        self._heap: list = []  # (expiração, desempate, chave)
+        self._counter = itertools.count()
+        self.evictions = 0
+
+    def try_acquire(self, key, cooldown: float) -> bool:
+        """True (e inicia o cooldown) se a chave estiver livre; False se ainda em cooldown."""
+        now = self._clock()
+        expires = self._expires.get(key)
+        if expires is not None and expires > now:
+            return False
+        expires = self._expires[key] = now + cooldown
+        heapq.heappush(self._heap, (expires, next(self._counter), key))
+        self.purge(now)
+        return True
+
+    def remaining(self, key) -> float:
+        """Segundos restantes de cooldown (0 se livre)."""
+        expires = self._expires.get(key)
+        if expires is None:
+            return 0.0
+        return max(0.0, expires - self._clock())
+
+    def reset(self, key):
+        self._expires.pop(key, None)
+
+    def purge(self, now: float | None = None) -> int:
+        """Remove as expiradas (pelo heap) e aplica o limite de tamanho."""
+        now = self._clock() if now is None else now
+        expires = self._expires
+        heap = self._heap
+        removed = 0
+        while heap and (heap[0][0] <= now or len(expires) > self.max_size):
+            when, _, key = heapq.heappop(heap)
+            if expires.get(key) != when:
+                continue  # entrada antiga (chave readquirida ou resetada)
+            if when > now:
+                self.evictions += 1
+            del expires[key]
+            removed += 1
+        # Muitas entradas antigas (resets): reconstrói o heap com as vigentes
+        if len(heap) > 2 * len(expires) + 1024:
+            self._heap = [(when, next(self._counter), key) for key, when in expires.items()]
+            heapq.heapify(self._heap)
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def __contains__(self, key) -> bool:
+        return self.remaining(key) > 0
@@ -0,0 +1,452 @@
+"""
+Motor de Armazenamento da Economia (SQLite em modo WAL) e Inventário
+Desenvolvido por: MARKIZIN
+"""
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from modules.journal import Journal
+from modules.serialization import read_file
+from modules.storage import ROOT, Storage, get_storage
+
+ECONOMY_DB = Path("economia.db")
+LEGACY_ECONOMY_FILE = Path("economia.json")
+ECONOMY_JOURNAL = Path("economia.journal.jsonl")
+ECONOMY_DIR = Path("economia")
+INVENTORY_KEY = "inventory"  # inventory.json + inventory.journal.jsonl no backend de arquivos
+
+
+class EconomyStore:
+    """Saldos persistidos linha a linha: cada operação custa O(1) em disco,
+    independente de quantos usuários existam.
+
+    O SQLite é a fonte da verdade. Cada operação reserva uma sequência,
+    é aplicada no banco (que guarda a última sequência aplicada) e só vai
+    para o diário depois do COMMIT: uma transação desfeita nunca deixa
+    entrada no diário. Na inicialização, entradas do diário além da
+    sequência do banco (ex.: banco restaurado de um backup) são reaplicadas.
+    """
+
+    def __init__(self, db_path: Path = ECONOMY_DB, legacy_file: Path | None = LEGACY_ECONOMY_FILE,
+                 journal: Journal | None = None):
+        self.db_path = Path(db_path)
+        self.journal = journal or Journal(ECONOMY_JOURNAL, scan=False)
+        self._lock = threading.RLock()
+        self._committed: list = []  # entradas da transação atual, gravadas no diário após o COMMIT
+        self._conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS saldos ("
+            " user_id INTEGER PRIMARY KEY,"
+            " saldo INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT)")
+        self._create_indexes()
+        if legacy_file is not None:
+            self._import_legacy(Path(legacy_file))
+        self._replay_journal()
+
+    def _create_indexes(self):
+        """Índice de ranking e totais mantidos por triggers (O(1) para /metricas)."""
+        with self._tx() as conn:
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_saldos_ranking ON saldos (saldo DESC, user_id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resumo ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " total INTEGER NOT NULL, usuarios INTEGER NOT NULL)"
+            )
+            # Semeia a partir dos saldos existentes só na primeira vez
+            conn.execute(
+                "INSERT OR IGNORE INTO resumo (id, total, usuarios)"
+                " SELECT 1, COALESCE(SUM(saldo), 0), COUNT(*) FROM saldos"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS resumo_insert AFTER INSERT ON saldos BEGIN"
+                " UPDATE resumo SET total = total + NEW.saldo, usuarios = usuarios + 1 WHERE id = 1; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS resumo_update AFTER UPDATE OF saldo ON saldos BEGIN"
+                " UPDATE resumo SET total = total + NEW.saldo - OLD.saldo WHERE id = 1; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS resumo_delete AFTER DELETE ON saldos BEGIN"
+                " UPDATE resumo SET total = total - OLD.saldo, usuarios = usuarios - 1 WHERE id = 1; END"
+            )
+
+    @contextmanager
+    def _tx(self):
+        """Transação de escrita (BEGIN IMMEDIATE ... COMMIT)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._committed = []
+            try:
+                yield self._conn
+            except BaseException:
+                self._committed = []
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+                entries, self._committed = self._committed, []
+                for entry in entries:
+                    self.journal.write(**entry)
+
+    def _import_legacy(self, legacy_file: Path):
+        """Importa o economia.json antigo uma única vez."""
+        row = self._conn.execute("SELECT valor FROM meta WHERE chave = 'legacy_importado'").fetchone()
+        if row or not legacy_file.exists():
+            return
+        try:
+            data = read_file(legacy_file)
+            rows = [(int(k), int(v)) for k, v in data.items()]
+        except (ValueError, AttributeError):
+            rows = []
+        with self._tx() as conn:
+            conn.executemany(
+                "INSERT INTO saldos (user_id, saldo) VALUES (?, ?)"
+                " ON CONFLICT(user_id) DO UPDATE SET saldo = excluded.saldo",
+                rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('legacy_importado', ?)", (str(legacy_file),))
+        print(f"   [OK] Economia importada de {legacy_file} ({len(rows)} saldos)")
+
+    def _applied_seq(self, conn) -> int:
+        row = conn.execute("SELECT valor FROM meta WHERE chave = 'journal_seq'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _replay_journal(self):
+        """Reaplica as operações do diário que não chegaram ao banco."""
+        with self._tx() as conn:
+            applied = self._applied_seq(conn)
+            replayed = 0
+            for entry in self.journal.recover(applied):
+                self._apply(conn, entry)
+                replayed += 1
+            self.journal.advance(applied)
+        if replayed:
+            print(f"   [OK] Economia: {replayed} operacao(oes) reaplicada(s) do diario")
+
+    def _apply(self, conn, entry: dict):
+        """Aplica uma entrada do diário (valores já validados na gravação)."""
+        op = entry["op"]
+        if op == "credit":
+            self._add(conn, entry["user"], entry["amount"])
+        elif op == "debit":
+            self._add(conn, entry["user"], -entry["amount"])
+        elif op == "transfer":
+            self._add(conn, entry["user"], -entry["amount"])
+            self._add(conn, entry["to"], entry["amount"])
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('journal_seq', ?)", (str(entry["seq"]),)
+        )
+
+    def _record(self, conn, op: str, **fields):
+        """Aplica no banco; a entrada do diário só é gravada se a transação fizer COMMIT."""
+        seq = self.journal.reserve()
+        self._apply(conn, {"seq": seq, "op": op, **fields})
+        self._committed.append({"seq": seq, "op": op, **fields})
+
+    def _balance(self, conn, user_id: int) -> int:
+        row = conn.execute("SELECT saldo FROM saldos WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def _add(self, conn, user_id: int, amount: int):
+        conn.execute(
+            "INSERT INTO saldos (user_id, saldo) VALUES (?, ?)"
+            " ON CONFLICT(user_id) DO UPDATE SET saldo = saldo + excluded.saldo",
+            (user_id, amount),
+        )
+
+    # ======== API ========
+    def get_balance(self, user_id: int) -> int:
+        """Retorna o saldo do usuário (0 se não existir)."""
+        with self._lock:
+            return self._balance(self._conn, user_id)
+
+    def credit(self, user_id: int, amount: int) -> int:
+        """Credita e retorna o novo saldo."""
+        with self._tx() as conn:
+            self._record(conn, "credit", user=user_id, amount=amount)
+            return self._balance(conn, user_id)
+
+    def debit(self, user_id: int, amount: int, allow_negative: bool = False, motivo: str | None = None) -> int | None:
+        """Debita e retorna o novo saldo, ou None se o saldo for insuficiente."""
+        with self._tx() as conn:
+            saldo = self._balance(conn, user_id)
+            if saldo < amount and not allow_negative:
+                return None
+            if motivo:
+                self._record(conn, "debit", user=user_id, amount=amount, motivo=motivo)
+            else:
+                self._record(conn, "debit", user=user_id, amount=amount)
+            return saldo - amount
+
+    def transfer(self, sender_id: int, receiver_id: int, amount: int) -> int | None:
+        """Transfere de forma atômica. Retorna o novo saldo do remetente ou None."""
+        with self._tx() as conn:
+            saldo = self._balance(conn, sender_id)
+            if saldo < amount:
+                return None
+            self._record(conn, "transfer", user=sender_id, to=receiver_id, amount=amount)
+            return saldo - amount
+
+    def top(self, limit: int = 10, offset: int = 0) -> list:
+        """Lista [(user_id, saldo)] em ordem decrescente, a partir de `offset` (via índice)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT user_id, saldo FROM saldos ORDER BY saldo DESC, user_id LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+
+    def import_balances(self, rows: list, marker: str) -> bool:
+        """Soma [(user_id, valor)] aos saldos numa única transação, uma vez por `marker`.
+
+        O marcador fica na tabela `meta` na mesma transação: repetir a
+        importação (ex.: queda antes do fim da migração) não credita de novo.
+        Retorna False se já tinha sido importado.
+        """
+        with self._tx() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE chave = ?", (marker,)).fetchone():
+                return False
+            conn.executemany(
+                "INSERT INTO saldos (user_id, saldo) VALUES (?, ?)"
+                " ON CONFLICT(user_id) DO UPDATE SET saldo = saldo + excluded.saldo",
+                rows,
+            )
+            conn.execute("INSERT INTO meta (chave, valor) VALUES (?, ?)", (marker, str(len(rows))))
+        return True
+
+    def all_balances(self) -> list:
+        """Lista [(user_id, saldo)] de todos os usuários (usado na migração)."""
+        with self._lock:
+            return self._conn.execute("SELECT user_id, saldo FROM saldos").fetchall()
+
+    def total_supply(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT total FROM resumo WHERE id = 1").fetchone()[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT usuarios FROM resumo WHERE id = 1").fetchone()[0]
+
+    def compact(self):
+        """Checkpoint do WAL e rotação do diário (rodar fora do event loop)."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            applied = self._applied_seq(self._conn)
+        self.journal.rotate(applied)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        self.journal.close()
+
+
+MIGRATION_POLICIES = ("copiar", "dividir", "principal")
+MIGRATION_MARKER = "migracao_global"
+
+
+class GuildEconomy:
+    """Economia particionada por servidor.
+
+    Cada guild tem seu próprio banco (economia/<guild_id>.db) e diário,
+    abertos só no primeiro acesso. Partições ociosas são fechadas quando
+    passam de `max_open` (cada operação já está no SQLite após o COMMIT,
+    então nada se perde).
+
+    `fetch()` abre a partição fria no executor (abrir o banco e reaplicar
+    o diário é E/S de disco) e junta acessos simultâneos na mesma abertura.
+    Partições presas com `pinned()` (ex.: compactando no executor) nunca
+    são fechadas pelo LRU; o limite volta a valer quando são soltas.
+    """
+
+    def __init__(self, base_dir: Path = ECONOMY_DIR, max_open: int = 64):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(exist_ok=True)
+        self.max_open = max_open
+        self._partitions: OrderedDict = OrderedDict()
+        self._opening: dict = {}  # guild_id -> Task da abertura em andamento
+        self._pins: dict = {}     # guild_id -> quantos usos em andamento impedem o fechamento
+
+    def _open(self, guild_id: int) -> EconomyStore:
+        journal = Journal(self.base_dir / f"{guild_id}.journal.jsonl", scan=False)
+        return EconomyStore(self.base_dir / f"{guild_id}.db", legacy_file=None, journal=journal)
+
+    def _insert(self, guild_id: int, store: EconomyStore):
+        self._partitions[guild_id] = store
+        self._evict()
+
+    def _evict(self):
+        """Fecha as partições menos usadas além de `max_open`, pulando as presas."""
+        excess = len(self._partitions) - self.max_open
+        for guild_id in list(self._partitions):
+            if excess <= 0:
+                break
+            if self._pins.get(guild_id):
+                continue
+            self._partitions.pop(guild_id).close()
+            excess -= 1
+
+    def get(self, guild_id: int) -> EconomyStore:
+        """Retorna a partição da guild, abrindo sob demanda (LRU) na thread atual.
+
+        No event loop use `fetch()`, que abre partições frias no executor.
+        """
+        store = self._partitions.get(guild_id)
+        if store is not None:
+            self._partitions.move_to_end(guild_id)
+            return store
+        store = self._open(guild_id)
+        self._insert(guild_id, store)
+        return store
+
+    async def fetch(self, guild_id: int) -> EconomyStore:
+        """Como `get()`, mas a abertura de uma partição fria roda no executor."""
+        store = self._partitions.get(guild_id)
+        if store is not None:
+            self._partitions.move_to_end(guild_id)
+            return store
+        opening = self._opening.get(guild_id)
+        if opening is None:
+            opening = self._opening[guild_id] = asyncio.get_running_loop().create_task(self._open_async(guild_id))
+        # shield: quem desistir de esperar não cancela a abertura dos outros
+        return await asyncio.shield(opening)
+
+    async def _open_async(self, guild_id: int) -> EconomyStore:
+        try:
+            store = await asyncio.get_running_loop().run_in_executor(None, self._open, guild_id)
+        finally:
+            self._opening.pop(guild_id, None)
+        self._insert(guild_id, store)
+        return store
+
+    @contextmanager
+    def pinned(self):
+        """Partições abertas agora, protegidas do LRU até o fim do bloco."""
+        items = list(self._partitions.items())
+        for guild_id, _ in items:
+            self._pins[guild_id] = self._pins.get(guild_id, 0) + 1
+        try:
+            yield [store for _, store in items]
+        finally:
+            for guild_id, _ in items:
+                left = self._pins[guild_id] - 1
+                if left:
+                    self._pins[guild_id] = left
+                else:
+                    del self._pins[guild_id]
+            self._evict()
+
+    def partitions(self) -> list:
+        """Partições abertas no momento."""
+        return list(self._partitions.values())
+
+    def needs_migration(self, legacy_db: Path = ECONOMY_DB, legacy_file: Path = LEGACY_ECONOMY_FILE) -> bool:
+        return legacy_db.exists() or legacy_file.exists()
+
+    def migrate_global(self, memberships: dict, policy: str = "copiar",
+                       legacy_db: Path = ECONOMY_DB, legacy_file: Path = LEGACY_ECONOMY_FILE) -> dict:
+        """Divide os saldos globais antigos entre as guilds.
+
+        memberships: {user_id: [guild_id, ...]} com as guilds onde o usuário está.
+        Políticas:
+          copiar    - cada guild recebe o saldo inteiro
+          dividir   - saldo dividido igualmente (resto vai para a primeira guild)
+          principal - saldo inteiro só na guild de menor ID
+        Usuários sem guild em comum ficam apenas no arquivo antigo.
+        Retorna {guild_id: quantidade de saldos migrados}.
+
+        Roda fora do event loop: cada guild recebe seus saldos numa única
+        transação, marcada em `meta`, antes de a base antiga ser renomeada;
+        se o processo cair no meio, a próxima execução pula as guilds já
+        migradas. Usa conexões próprias, sem mexer no cache de partições.
+        """
+        if policy not in MIGRATION_POLICIES:
+            raise ValueError(f"Politica de migracao invalida: {policy}")
+        legacy = EconomyStore(legacy_db, legacy_file=legacy_file, journal=Journal(ECONOMY_JOURNAL, scan=False))
+        try:
+            rows = legacy.all_balances()
+        finally:
+            legacy.close()
+        per_guild: dict = {}
+        orphans = 0
+        for user_id, saldo in rows:
+            guilds = sorted(memberships.get(user_id, []))
+            if not saldo:
+                continue
+            if not guilds:
+                orphans += 1
+                continue
+            if policy == "copiar":
+                shares = [(gid, saldo) for gid in guilds]
+            elif policy == "dividir":
+                base, resto = divmod(saldo, len(guilds))
+                shares = [(gid, base + (resto if i == 0 else 0)) for i, gid in enumerate(guilds)]
+            else:
+                shares = [(guilds[0], saldo)]
+            for gid, valor in shares:
+                per_guild.setdefault(gid, []).append((user_id, valor))
+        for gid, balances in per_guild.items():
+            store = self._open(gid)
+            try:
+                store.import_balances(balances, MIGRATION_MARKER)
+            finally:
+                store.close()
+        if orphans:
+            print(f"  [AVISO] Economia: {orphans} usuario(s) sem servidor em comum ficaram so na base antiga (.migrado)")
+        # Marcar a base global como migrada (mantida para auditoria)
+        for path in (legacy_db, Path(f"{legacy_db}-wal"), Path(f"{legacy_db}-shm"), ECONOMY_JOURNAL, legacy_file):
+            if path.exists():
+                path.replace(path.with_name(path.name + ".migrado"))
+        return {gid: len(b) for gid, b in per_guild.items()}
+
+    def close(self):
+        for store in self._partitions.values():
+            store.close()
+        self._partitions.clear()
+
+
+class InventoryStore:
+    """Inventário em memória: snapshot + diário de compras, ambos no `Storage`."""
+
+    def __init__(self, storage: Storage | None = None):
+        self.storage = storage or get_storage()
+        self.journal = self.storage.log(INVENTORY_KEY)
+        self._lock = threading.Lock()
+        self.seq, self.items = self._load_snapshot()
+        for entry in self.journal.replay(self.seq):
+            self._apply(entry)
+        self.journal.advance(self.seq)
+
+    def _load_snapshot(self) -> tuple:
+        data = self.storage.get(ROOT, INVENTORY_KEY, {})
+        # Formato antigo: dict simples user_id -> [itens]
+        if "seq" not in data or "data" not in data:
+            return 0, {str(k): v for k, v in data.items()}
+        return data["seq"], {str(k): v for k, v in data["data"].items()}
+
+    def _apply(self, entry: dict):
+        if entry["op"] == "purchase":
+            self.items.setdefault(str(entry["user"]), []).append(entry["item"])
+        self.seq = entry["seq"]
+
+    def get_items(self, user_id: int) -> list:
+        return list(self.items.get(str(user_id), []))
+
+    def add_item(self, user_id: int, item: str, price: int | None = None):
+        """Registra a compra no diário e aplica em memória."""
+        with self._lock:
+            seq = self.journal.append("purchase", user=user_id, item=item, price=price)
+            self._apply({"seq": seq, "op": "purchase", "user": user_id, "item": item})
+
+    def compact(self):
+        """Grava um snapshot novo e rotaciona o diário (rodar fora do event loop)."""
+        with self._lock:
+            seq = self.seq
+            data = {k: list(v) for k, v in self.items.items()}
+        self.storage.put(ROOT, INVENTORY_KEY, {"seq": seq, "data": data})
+        self.journal.rotate(seq)
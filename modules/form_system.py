@@ -5,31 +5,23 @@ Desenvolvido por: MARKIZIN
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
+from modules.storage import ROOT, get_storage
 from datetime import datetime
-from pathlib import Path
 
 class FormSystem:
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, storage=None):
         self.config_manager = config_manager
-        self.responses_file = Path("form_responses.json")
+        self.storage = storage or get_storage()
         self.responses = self._load_responses()
     
     def _load_responses(self) -> dict:
         """Carrega respostas salvas."""
-        if not self.responses_file.exists():
-            return {}
-        try:
-            with open(self.responses_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
+        return self.storage.get(ROOT, "form_responses", {})
     
     def _save_responses(self):
         """Salva respostas."""
         try:
-            with open(self.responses_file, 'w', encoding='utf-8') as f:
-                json.dump(self.responses, f, indent=2, ensure_ascii=False)
+            self.storage.put(ROOT, "form_responses", self.responses)
         except Exception as e:
             print(f"Erro ao salvar respostas: {e}")
     
@@ -6,18 +6,17 @@ https://ggmax.com.br/perfil/markizin002
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
-from pathlib import Path
 from datetime import datetime, timezone, timedelta
 import random
 import asyncio
 import hashlib
+from modules.storage import ROOT, get_storage
 from modules.components_v2 import make_card, make_success, make_error, brand_footer, BrandedView
 
 # ⚠️ PROTEÇÃO DE AUTORIA - NÃO REMOVER
 _AUTHOR_CHECK = hashlib.md5(b"MARKIZIN").hexdigest()
 
-GIVEAWAY_FILE = Path("giveaways.json")
+GIVEAWAY_KEY = "giveaways"
 
 
 def _utcnow():
@@ -25,23 +24,17 @@ def _utcnow():
 
 
 class GiveawaySystem:
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, storage=None):
         self.config_manager = config_manager
+        self.storage = storage or get_storage()
         self.data = self._load()
 
     def _load(self) -> dict:
-        if not GIVEAWAY_FILE.exists():
-            return {"giveaways": []}
-        try:
-            return json.loads(GIVEAWAY_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return {"giveaways": []}
+        return self.storage.get(ROOT, GIVEAWAY_KEY, {"giveaways": []})
 
     def _save(self):
         try:
-            tmp = GIVEAWAY_FILE.with_suffix(".tmp")
-            tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
-            tmp.replace(GIVEAWAY_FILE)
+            self.storage.put(ROOT, GIVEAWAY_KEY, self.data)
         except Exception as e:
             print(f"Erro ao salvar giveaways: {e}")
 
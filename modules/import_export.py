@@ -5,7 +5,7 @@ Desenvolvido por: MARKIZIN
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
+from modules.serialization import read_file, write_file
 from datetime import datetime
 from pathlib import Path
 
@@ -49,8 +49,7 @@ class ImportExportSystem:
                 export_data["modules"][module] = {}
         
         # Salvar exportação
-        with open(export_path, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        write_file(export_path, export_data, pretty=True)
         
         return str(export_path)
     
@@ -78,8 +77,7 @@ class ImportExportSystem:
     def import_config(self, guild_id: int, import_file: str, modules: list = None, merge: bool = True) -> dict:
         """Importa configurações de um arquivo de exportação."""
         try:
-            with open(import_file, 'r', encoding='utf-8') as f:
-                import_data = json.load(f)
+            import_data = read_file(import_file)
             
             # Validar formato
             if import_data.get("version") != "1.0":
@@ -88,28 +86,31 @@ class ImportExportSystem:
             imported = []
             skipped = []
             
-            for module, config in import_data.get("modules", {}).items():
-                if modules and module not in modules:
-                    skipped.append(module)
-                    continue
-                
-                if not config:
-                    skipped.append(module)
-                    continue
-                
-                try:
-                    if merge:
-                        # Mesclar com configurações existentes
-                        existing = self.config_manager.get_guild_config(guild_id, module)
-                        existing.update(config)
-                        self.config_manager.update_guild_config(guild_id, module, existing)
-                    else:
-                        # Substituir completamente
-                        self.config_manager.update_guild_config(guild_id, module, config)
+            # Todos os módulos em uma única transação (uma escrita, tudo ou nada)
+            with self.config_manager.batch(guild_id) as cfg:
+                for module, config in import_data.get("modules", {}).items():
+                    if modules and module not in modules:
+                        skipped.append(module)
+                        continue
+                    
+                    if not config:
+                        skipped.append(module)
+                        continue
+                    
+                    # Um módulo com erro aborta a transação inteira (nada é aplicado)
+                    try:
+                        if merge:
+                            # Mesclar com configurações existentes
+                            existing = cfg.get(module)
+                            existing.update(config)
+                            cfg.update(module, existing)
+                        else:
+                            # Substituir completamente
+                            cfg.update(module, config)
+                    except Exception as e:
+                        raise ValueError(f"Módulo {module} inválido, nada foi importado: {e}") from e
                     
                     imported.append(module)
-                except Exception as e:
-                    skipped.append(f"{module} (erro: {str(e)})")
             
             return {
                 "success": True,
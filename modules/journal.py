@@ -0,0 +1,137 @@
+"""
+Diário de Transações (append-only) com Compactação
+Desenvolvido por: MARKIZIN
+"""
+from modules.serialization import dumps, loads
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+ARCHIVE_DIR = Path("journal_archive")
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Journal:
+    """Uma linha JSON por operação, com número de sequência crescente.
+
+    O snapshot fica a cargo de quem usa o diário; `rotate()` arquiva as
+    linhas já cobertas pelo snapshot e mantém apenas a cauda.
+
+    `append()` não faz fsync por padrão (roda no event loop a cada
+    operação); o fsync acontece em `rotate()`, que roda fora do loop.
+
+    Com `scan=False` o arquivo não é lido na abertura: quem vai reaplicar
+    a cauda chama `recover()`, que acerta `seq`/`pending` na mesma leitura.
+    """
+
+    def __init__(self, path: Path, archive_dir: Path = ARCHIVE_DIR, fsync: bool = False, scan: bool = True):
+        self.path = Path(path)
+        self.archive_dir = Path(archive_dir)
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self.seq = 0
+        self.pending = 0
+        if scan:
+            self.recover()
+        self._fp = open(self.path, "a", encoding="utf-8")
+
+    def recover(self, after_seq: int | None = None) -> list:
+        """Lê o diário uma vez, acerta `seq`/`pending` e retorna as entradas com seq > after_seq."""
+        seq = pending = 0
+        tail = []
+        for entry in self.replay():
+            seq = entry["seq"]
+            pending += 1
+            if after_seq is not None and seq > after_seq:
+                tail.append(entry)
+        with self._lock:
+            self.seq = max(self.seq, seq)
+            self.pending = pending
+        return tail
+
+    def advance(self, seq: int):
+        """Garante que a próxima sequência continue após `seq` (diário vazio após rotação)."""
+        with self._lock:
+            self.seq = max(self.seq, seq)
+
+    def reserve(self) -> int:
+        """Reserva a próxima sequência sem gravar nada (a entrada vem com `write()`)."""
+        with self._lock:
+            self.seq += 1
+            return self.seq
+
+    def write(self, seq: int, op: str, **fields):
+        """Grava a entrada de uma sequência já reservada."""
+        with self._lock:
+            entry = {"seq": seq, "ts": _utcnow().isoformat(), "op": op, **fields}
+            self._fp.write(dumps(entry) + "\n")
+            self._fp.flush()
+            if self.fsync:
+                os.fsync(self._fp.fileno())
+            self.pending += 1
+
+    def append(self, op: str, **fields) -> int:
+        """Grava a operação no fim do diário e retorna sua sequência."""
+        with self._lock:
+            seq = self.reserve()
+            self.write(seq, op, **fields)
+            return seq
+
+    def replay(self, after_seq: int = 0):
+        """Itera as entradas com seq > after_seq.
+
+        Só a última linha pode estar truncada (queda no meio da escrita) e é
+        ignorada; uma linha inválida no meio do arquivo é corrupção de
+        verdade e gera ValueError em vez de ser pulada em silêncio.
+        """
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            bad_line = None
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                if bad_line is not None:
+                    raise ValueError(f"Diario corrompido: {self.path}, linha {bad_line}")
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    bad_line = number
+                    continue
+                if entry.get("seq", 0) > after_seq:
+                    yield entry
+
+    def rotate(self, upto_seq: int):
+        """Arquiva as entradas até `upto_seq` e reescreve o diário só com a cauda."""
+        with self._lock:
+            if self._fp.closed:
+                return
+            self._fp.close()
+            head, tail = [], []
+            for entry in self.replay():
+                (head if entry["seq"] <= upto_seq else tail).append(entry)
+            if head:
+                self.archive_dir.mkdir(exist_ok=True)
+                stamp = _utcnow().strftime("%Y%m%d_%H%M%S")
+                self._write_lines(self.archive_dir / f"{self.path.stem}_{stamp}_ate_{upto_seq}.jsonl", head)
+            self._write_lines(self.path, tail)
+            self.pending = len(tail)
+            self._fp = open(self.path, "a", encoding="utf-8")
+
+    def _write_lines(self, path: Path, entries: list):
+        """Escrita atômica (tmp + replace)."""
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(path)
+
+    def close(self):
+        with self._lock:
+            self._fp.close()
@@ -0,0 +1,191 @@
+"""
+Armazenamento Colunar de XP (servidores muito grandes)
+Desenvolvido por: MARKIZIN
+
+Em vez de `str(guild) -> str(user) -> {"xp", "messages"}`, cada servidor
+guarda três arrays paralelos de inteiros de 64 bits: ids de usuário em
+ordem crescente, xp e mensagens. Um membro custa 24 bytes em vez de duas
+strings, um dict e seus inteiros.
+
+Persistência binária (little-endian), lida com uma única leitura:
+    cabeçalho : b"LVC1" + número de servidores (uint32)
+    servidor  : guild_id (uint64) + n (uint64) + ids[n] + xp[n] + messages[n]
+
+Ative com LEVELING_STORE=columnar. Na primeira carga sem o binário, os
+dados são convertidos do `leveling` em JSON (que fica intocado).
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+
+from modules.storage import ROOT
+
+LEVELING_BLOB = "leveling"
+_MAGIC = b"LVC1"
+_HEADER = struct.Struct("<4sI")
+_GUILD = struct.Struct("<QQ")
+_SWAP = sys.byteorder != "little"
+
+
+class UserRecord:
+    """Visão de um membro com a mesma interface do dict antigo
+    (`user["xp"]`, `user.get("messages", 0)`), lendo direto dos arrays."""
+
+    __slots__ = ("_guild", "_uid")
+
+    def __init__(self, guild: "ColumnarGuild", uid: int):
+        self._guild = guild
+        self._uid = uid
+
+    def _column(self, key: str) -> array:
+        if key == "xp":
+            return self._guild.xp
+        if key == "messages":
+            return self._guild.messages
+        raise KeyError(key)
+
+    def __getitem__(self, key: str) -> int:
+        return self._column(key)[self._guild._pos(self._uid)]
+
+    def __setitem__(self, key: str, value: int):
+        self._column(key)[self._guild._pos(self._uid)] = value
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> dict:
+        i = self._guild._pos(self._uid)
+        return {"xp": self._guild.xp[i], "messages": self._guild.messages[i]}
+
+
+class ColumnarGuild(MutableMapping):
+    """Mapeamento `str(user_id) -> UserRecord` sobre arrays ordenados por id.
+
+    Busca em O(log n); inserir um membro novo custa um memmove O(n), o que
+    só acontece na primeira mensagem de cada pessoa.
+    """
+
+    __slots__ = ("ids", "xp", "messages")
+
+    def __init__(self):
+        self.ids = array("Q")
+        self.xp = array("q")
+        self.messages = array("q")
+
+    @classmethod
+    def from_dict(cls, users: dict) -> "ColumnarGuild":
+        guild = cls()
+        for uid in sorted(users, key=int):
+            d = users[uid]
+            guild.ids.append(int(uid))
+            guild.xp.append(d.get("xp", 0))
+            guild.messages.append(d.get("messages", 0))
+        return guild
+
+    def _find(self, uid: int) -> int:
+        """Posição de `uid` ou -1."""
+        i = bisect_left(self.ids, uid)
+        return i if i < len(self.ids) and self.ids[i] == uid else -1
+
+    def _pos(self, uid: int) -> int:
+        i = self._find(uid)
+        if i < 0:
+            raise KeyError(uid)
+        return i
+
+    def __getitem__(self, key: str) -> UserRecord:
+        uid = int(key)
+        if self._find(uid) < 0:
+            raise KeyError(key)
+        return UserRecord(self, uid)
+
+    def __setitem__(self, key: str, value):
+        uid = int(key)
+        xp = value.get("xp", 0)
+        messages = value.get("messages", 0)
+        i = bisect_left(self.ids, uid)
+        if i < len(self.ids) and self.ids[i] == uid:
+            self.xp[i] = xp
+            self.messages[i] = messages
+        else:
+            self.ids.insert(i, uid)
+            self.xp.insert(i, xp)
+            self.messages.insert(i, messages)
+
+    def __delitem__(self, key: str):
+        i = self._pos(int(key))
+        del self.ids[i]
+        del self.xp[i]
+        del self.messages[i]
+
+    def __contains__(self, key) -> bool:
+        return self._find(int(key)) >= 0
+
+    def __iter__(self):
+        return (str(uid) for uid in self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def xp_pairs(self):
+        """(user_id, xp) em uma passada, sem criar UserRecord por membro."""
+        return zip(self.ids, self.xp)
+
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in (self.ids, self.xp, self.messages))
+
+
+def dump_columnar(data: dict) -> bytes:
+    parts = [_HEADER.pack(_MAGIC, len(data))]
+    for gk, guild in data.items():
+        parts.append(_GUILD.pack(int(gk), len(guild)))
+        for col in (guild.ids, guild.xp, guild.messages):
+            if _SWAP:
+                col = array(col.typecode, col)
+                col.byteswap()
+            parts.append(col.tobytes())
+    return b"".join(parts)
+
+
+def load_columnar(blob: bytes) -> dict:
+    """Decodifica o binário; ValueError se o tamanho não bater com os cabeçalhos."""
+    view = memoryview(blob)
+    if len(view) < _HEADER.size:
+        raise ValueError("arquivo de leveling colunar truncado (cabeçalho)")
+    magic, count = _HEADER.unpack_from(view, 0)
+    if magic != _MAGIC:
+        raise ValueError("arquivo de leveling colunar inválido")
+    offset = _HEADER.size
+    data = {}
+    for index in range(count):
+        if offset + _GUILD.size > len(view):
+            raise ValueError(f"arquivo de leveling colunar truncado (servidor {index + 1} de {count})")
+        guild_id, n = _GUILD.unpack_from(view, offset)
+        offset += _GUILD.size
+        guild = ColumnarGuild()
+        if offset + 3 * n * guild.ids.itemsize > len(view):
+            raise ValueError(f"arquivo de leveling colunar truncado (servidor {guild_id}: {n} membros)")
+        for col in (guild.ids, guild.xp, guild.messages):
+            size = n * col.itemsize
+            col.frombytes(view[offset:offset + size])
+            if _SWAP:
+                col.byteswap()
+            offset += size
+        data[str(guild_id)] = guild
+    if offset != len(view):
+        raise ValueError(f"arquivo de leveling colunar com {len(view) - offset} bytes sobrando")
+    return data
+
+
+def load_from_storage(storage, legacy_key: str) -> dict:
+    """Lê o binário; se não existir, converte o JSON do layout antigo."""
+    blob = storage.get_blob(ROOT, LEVELING_BLOB)
+    if blob is not None:
+        return load_columnar(blob)
+    legacy = storage.get(ROOT, legacy_key, {})
+    return {gk: ColumnarGuild.from_dict(users) for gk, users in legacy.items()}
@@ -6,18 +6,23 @@ https://ggmax.com.br/perfil/markizin002
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
-from pathlib import Path
 from datetime import datetime, timezone
 import random
+from bisect import bisect_right
 import hashlib
+import os
+from modules.storage import ROOT, get_storage
+from modules.leveling_columnar import ColumnarGuild, dump_columnar, load_from_storage, LEVELING_BLOB
+from modules.rank_index import SortedBuckets
+from modules.cooldowns import CooldownMap
+from modules.action_queue import KeyedRateLimitedQueue
 from modules.components_v2 import make_card, make_success, make_error, brand_footer, BrandedView
 
 # ⚠️ PROTEÇÃO DE AUTORIA - NÃO REMOVER
 _AUTHOR_CHECK = hashlib.md5(b"MARKIZIN").hexdigest()
 
-LEVELING_FILE = Path("leveling.json")
-_xp_cooldowns = {}
+LEVELING_KEY = "leveling"
+_xp_cooldowns = CooldownMap(max_size=200_000)
 
 
 def _utcnow():
@@ -29,44 +34,89 @@ def _xp_for_level(level: int) -> int:
     return 5 * (level ** 2) + 50 * level + 100
 
 
+# Nível máximo aceito pelo /setlevel (o XP total ainda cabe em int64)
+MAX_LEVEL = 1_000_000
+
+
+def _total_xp_for_level(level: int) -> int:
+    """XP total (acumulado) para atingir um nível, em fórmula fechada.
+
+    Soma de _xp_for_level(k) para k em 0..level-1, que se reduz a
+    (10n³ + 135n² + 455n) / 6; O(1) e sem tabela, então um nível
+    arbitrário não aloca nada.
+    """
+    n = max(0, level)
+    return n * (n * (10 * n + 135) + 455) // 6
+
+
+def _icbrt(n: int) -> int:
+    """Raiz cúbica inteira (piso), exata para qualquer int.
+
+    Até 2**150 a estimativa em float erra menos de 1 e só é corrigida;
+    acima disso, Newton a partir de uma potência de 2.
+    """
+    if n < 2:
+        return max(0, n)
+    if n.bit_length() <= 150:
+        x = int(n ** (1 / 3))
+    else:
+        x = 1 << -(-n.bit_length() // 3)  # >= cbrt(n)
+        while True:
+            y = (2 * x + n // (x * x)) // 3
+            if y >= x:
+                break
+            x = y
+    while x * x * x > n:
+        x -= 1
+    while (x + 1) * (x + 1) * (x + 1) <= n:
+        x += 1
+    return x
+
+
+# _cumulative_xp[n] = XP total necessário para chegar ao nível n, para os
+# níveis comuns (tamanho fixo). Acima disso o nível sai da inversa da fórmula.
+_TABLE_LEVELS = 10_000
+_cumulative_xp = [_total_xp_for_level(n) for n in range(_TABLE_LEVELS + 1)]
+
+
 def _level_from_xp(xp: int) -> int:
     """Calcula o nível a partir do XP total."""
-    level = 0
-    while xp >= _xp_for_level(level):
-        xp -= _xp_for_level(level)
+    if xp < _cumulative_xp[-1]:
+        return max(0, bisect_right(_cumulative_xp, xp) - 1)
+    # total(n) = (10n³ + 135n² + 455n) / 6 ~ 10(n + 4.5)³ / 6, então o nível
+    # fica a uma ou duas unidades de cbrt(0.6·xp) - 4; a correção é exata.
+    level = _icbrt(3 * xp // 5) - 4
+    total = _total_xp_for_level(level)
+    while total > xp:
+        level -= 1
+        total -= _xp_for_level(level)
+    while total + _xp_for_level(level) <= xp:
+        total += _xp_for_level(level)
         level += 1
     return level
 
 
 def _xp_progress(xp: int) -> tuple:
     """Retorna (nível_atual, xp_no_nível, xp_necessário_para_próximo)."""
-    level = 0
-    remaining = xp
-    while remaining >= _xp_for_level(level):
-        remaining -= _xp_for_level(level)
-        level += 1
-    return level, remaining, _xp_for_level(level)
+    level = _level_from_xp(xp)
+    return level, xp - _total_xp_for_level(level), _xp_for_level(level)
 
 
 class LevelingSystem:
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, storage=None):
         self.config_manager = config_manager
+        self.storage = storage or get_storage()
         self.data = self._load()
         self._dirty = False
+        # Índice de ranking por servidor (chaves de `_rank_key`), montado no primeiro uso
+        self._ranks: dict = {}
 
     def _load(self) -> dict:
-        if not LEVELING_FILE.exists():
-            return {}
-        try:
-            return json.loads(LEVELING_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
+        return self.storage.get(ROOT, LEVELING_KEY, {})
 
     def _save(self):
         try:
-            tmp = LEVELING_FILE.with_suffix(".tmp")
-            tmp.write_text(json.dumps(self.data, ensure_ascii=False), encoding="utf-8")
-            tmp.replace(LEVELING_FILE)
+            self.storage.put(ROOT, LEVELING_KEY, self.data)
             self._dirty = False
         except Exception as e:
             print(f"Erro ao salvar leveling: {e}")
@@ -79,65 +129,229 @@ class LevelingSystem:
         gk = str(guild_id)
         uk = str(user_id)
         if gk not in self.data:
-            self.data[gk] = {}
+            self.data[gk] = self._new_guild()
         if uk not in self.data[gk]:
             self.data[gk][uk] = {"xp": 0, "messages": 0}
+            index = self._ranks.get(gk)
+            if index is not None:
+                index.add(self._rank_key(0, user_id))
         return self.data[gk][uk]
 
-    def add_xp(self, guild_id: int, user_id: int, amount: int) -> tuple:
+    def _new_guild(self):
+        return {}
+
+    def _xp_pairs(self, users):
+        """(user_id, xp) de todos os membros de um servidor."""
+        return ((int(uid), d.get("xp", 0)) for uid, d in users.items())
+
+    @staticmethod
+    def _rank_key(xp: int, user_id: int):
+        """Chave do índice de ranking: ordem crescente = maior XP primeiro."""
+        return (-xp, user_id)
+
+    @staticmethod
+    def _rank_entry(key) -> tuple:
+        """Chave do índice -> (user_id, xp)."""
+        neg_xp, uid = key
+        return uid, -neg_xp
+
+    def _rank_index(self, guild_id: int) -> SortedBuckets:
+        gk = str(guild_id)
+        index = self._ranks.get(gk)
+        if index is None:
+            users = self.data.get(gk, {})
+            index = self._ranks[gk] = SortedBuckets(self._rank_key(xp, uid) for uid, xp in self._xp_pairs(users))
+        return index
+
+    def _set_xp(self, guild_id: int, user_id: int, user: dict, xp: int):
+        """Único ponto que altera o XP: mantém o índice de ranking em dia."""
+        index = self._ranks.get(str(guild_id))
+        if index is not None:
+            index.discard(self._rank_key(user.get("xp", 0), user_id))
+            index.add(self._rank_key(xp, user_id))
+        user["xp"] = xp
+        self._dirty = True
+
+    def add_xp(self, guild_id: int, user_id: int, amount: int, messages: int = 1) -> tuple:
         """Adiciona XP e retorna (old_level, new_level)."""
         user = self._ensure_user(guild_id, user_id)
         old_level = _level_from_xp(user["xp"])
-        user["xp"] += amount
-        user["messages"] = user.get("messages", 0) + 1
+        self._set_xp(guild_id, user_id, user, user["xp"] + amount)
+        user["messages"] = user.get("messages", 0) + messages
         new_level = _level_from_xp(user["xp"])
-        self._dirty = True
         return old_level, new_level
 
+    def set_xp(self, guild_id: int, user_id: int, xp: int):
+        user = self._ensure_user(guild_id, user_id)
+        self._set_xp(guild_id, user_id, user, xp)
+
     def get_user(self, guild_id: int, user_id: int) -> dict:
         return self._ensure_user(guild_id, user_id)
 
-    def get_leaderboard(self, guild_id: int, limit: int = 10) -> list:
-        gk = str(guild_id)
-        if gk not in self.data:
+    def get_leaderboard(self, guild_id: int, limit: int = 10, offset: int = 0) -> list:
+        """[(user_id, xp)] do maior para o menor XP, a partir de `offset`. O(limit)."""
+        if str(guild_id) not in self.data:
             return []
-        users = [(int(uid), d.get("xp", 0)) for uid, d in self.data[gk].items()]
-        users.sort(key=lambda x: x[1], reverse=True)
-        return users[:limit]
+        return [self._rank_entry(key) for key in self._rank_index(guild_id).head(limit, offset)]
 
     def get_rank(self, guild_id: int, user_id: int) -> int:
-        gk = str(guild_id)
-        if gk not in self.data:
+        """Posição (1 = primeiro) do usuário no servidor, 0 se não tiver dados. O(log n)."""
+        user = self.data.get(str(guild_id), {}).get(str(user_id))
+        if user is None:
             return 0
-        users = sorted(self.data[gk].items(), key=lambda x: x[1].get("xp", 0), reverse=True)
-        for i, (uid, _) in enumerate(users, 1):
-            if int(uid) == user_id:
-                return i
-        return 0
+        return self._rank_index(guild_id).rank(self._rank_key(user.get("xp", 0), user_id)) + 1
 
     def reset_user(self, guild_id: int, user_id: int):
         gk = str(guild_id)
         uk = str(user_id)
         if gk in self.data and uk in self.data[gk]:
+            user = self.data[gk][uk]
+            self._set_xp(guild_id, user_id, user, 0)
             self.data[gk][uk] = {"xp": 0, "messages": 0}
-            self._dirty = True
+
+
+class ColumnarLevelingSystem(LevelingSystem):
+    """Mesma API, com cada servidor em arrays paralelos (`ColumnarGuild`)
+    e persistência binária. `get_user` retorna um `UserRecord`, que aceita
+    `user["xp"]` e `user.get(...)` como o dict.
+
+    O índice de ranking usa um único int por membro em vez da tupla
+    (-xp, user_id): (_XP_CAP - xp) << 64 | user_id, na mesma ordem.
+
+    Se o binário não carregar, o sistema fica sem dados e não grava nada:
+    salvar por cima apagaria o XP que ainda está no arquivo.
+    """
+
+    _XP_CAP = (1 << 63) - 1
+    _UID_MASK = (1 << 64) - 1
+
+    def _load(self) -> dict:
+        self._load_failed = False
+        try:
+            return load_from_storage(self.storage, LEVELING_KEY)
+        except Exception as e:
+            self._load_failed = True
+            print(f"  [ERRO] Falha ao carregar leveling colunar, gravação desativada: {e}")
+            return {}
+
+    @classmethod
+    def _rank_key(cls, xp: int, user_id: int) -> int:
+        return ((cls._XP_CAP - xp) << 64) | user_id
+
+    @classmethod
+    def _rank_entry(cls, key: int) -> tuple:
+        return key & cls._UID_MASK, cls._XP_CAP - (key >> 64)
+
+    def _save(self):
+        if self._load_failed:
+            print("  [ERRO] Leveling colunar não foi carregado; nada foi salvo para não sobrescrever os dados")
+            return
+        try:
+            self.storage.put_blob(ROOT, LEVELING_BLOB, dump_columnar(self.data))
+            self._dirty = False
+        except Exception as e:
+            print(f"Erro ao salvar leveling: {e}")
+
+    def _new_guild(self):
+        return ColumnarGuild()
+
+    def _xp_pairs(self, users):
+        return users.xp_pairs() if users else ()
+
+
+def open_leveling(config_manager, storage=None) -> LevelingSystem:
+    """Escolhe o layout pela variável LEVELING_STORE (dict | columnar)."""
+    store = os.getenv("LEVELING_STORE", "dict").strip().lower()
+    if store == "columnar":
+        return ColumnarLevelingSystem(config_manager, storage)
+    if store != "dict":
+        print(f"  [AVISO] LEVELING_STORE inválido: {store!r}, usando dict")
+    return LevelingSystem(config_manager, storage)
+
+
+class XPAggregator:
+    """Acumula XP por (guild, usuário) e aplica em lote a cada `tick()`.
+
+    Level-ups são detectados uma vez por tick; avisos e cargos saem por uma
+    fila por servidor (`guild_rate` por segundo) e todas dividem um teto
+    global de `rate` por segundo: uma enxurrada de level-ups não estoura o
+    rate limit da API, por mais servidores ativos que haja, nem atrasa os
+    outros servidores.
+    No desligamento, `tick(notify=False)` aplica o XP pendente sem avisos.
+    """
+
+    def __init__(self, leveling: LevelingSystem, config_manager, rate: float = 5.0, guild_rate: float = 2.0):
+        self.leveling = leveling
+        self.config_manager = config_manager
+        self._pending: dict = {}
+        self.actions = KeyedRateLimitedQueue(rate=guild_rate, global_rate=rate, name="level-up")
+
+    def award(self, member: discord.Member, channel, amount: int):
+        key = (member.guild.id, member.id)
+        entry = self._pending.get(key)
+        if entry is None:
+            self._pending[key] = [amount, 1, member, channel]
+        else:
+            entry[0] += amount
+            entry[1] += 1
+            entry[2] = member
+            entry[3] = channel
+
+    def tick(self, notify: bool = True):
+        """Aplica o XP acumulado e enfileira avisos/cargos de quem subiu de nível."""
+        pending, self._pending = self._pending, {}
+        configs = {}
+        for (guild_id, user_id), (amount, messages, member, channel) in pending.items():
+            old_level, new_level = self.leveling.add_xp(guild_id, user_id, amount, messages)
+            if new_level <= old_level or not notify:
+                continue
+            cfg = configs.get(guild_id)
+            if cfg is None:
+                cfg = configs[guild_id] = self.config_manager.get_guild_config(guild_id, "leveling")
+            self._queue_level_up(cfg, member, channel, old_level, new_level)
+
+    def _queue_level_up(self, cfg: dict, member: discord.Member, channel, old_level: int, new_level: int):
+        notify_channel_id = cfg.get("notify_channel_id")
+        target = member.guild.get_channel(notify_channel_id) if notify_channel_id else channel
+
+        msg_template = cfg.get("levelup_message", "{user} subiu para o **nivel {level}**")
+        text = msg_template.format(user=member.mention, level=new_level)
+        embed = discord.Embed(
+            title="Level Up",
+            description=text,
+            color=cfg.get("levelup_color", 0xFFD700),
+            timestamp=_utcnow()
+        )
+        embed.set_footer(text="Desenvolvido por MARKIZIN")
+        if target is not None:
+            self.actions.put(member.guild.id, lambda: target.send(embed=embed))
+
+        # Cargos de todos os níveis cruzados neste tick
+        level_roles = cfg.get("level_roles", {})
+        roles = []
+        for level in range(old_level + 1, new_level + 1):
+            role_id = level_roles.get(str(level))
+            role = member.guild.get_role(role_id) if role_id else None
+            if role:
+                roles.append(role)
+        if roles:
+            self.actions.put(member.guild.id, lambda: member.add_roles(*roles, reason=f"Atingiu nível {new_level}"))
 
 
 class LevelingCommands(commands.Cog):
-    def __init__(self, bot, leveling: LevelingSystem, config_manager):
+    def __init__(self, bot, leveling: LevelingSystem, config_manager, aggregator: XPAggregator):
         self.bot = bot
         self.leveling = leveling
         self.config_manager = config_manager
+        self.aggregator = aggregator
         # ⚠️ PROTEÇÃO DE AUTORIA
         if _AUTHOR_CHECK != "7e94cd9fff4a493ba6b9b2abcc38f3c0":
             raise RuntimeError("Falha de integridade")
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot or not message.guild:
-            return
-
-        cfg = self.config_manager.get_guild_config(message.guild.id, "leveling")
+    async def handle_message(self, ctx):
+        """Etapa de XP do pipeline de mensagens (bot.message_pipeline)."""
+        message = ctx.message
+        cfg = ctx.config("leveling")
         if not cfg.get("enabled", False):
             return
 
@@ -148,50 +362,13 @@ class LevelingCommands(commands.Cog):
 
         # Cooldown de XP (60s por padrão)
         cooldown = cfg.get("xp_cooldown", 60)
-        now = _utcnow()
-        key = (message.guild.id, message.author.id)
-        last = _xp_cooldowns.get(key)
-        if last and (now - last).total_seconds() < cooldown:
+        if not _xp_cooldowns.try_acquire((message.guild.id, message.author.id), cooldown):
             return
-        _xp_cooldowns[key] = now
 
-        # Adicionar XP
+        # Acumular XP (aplicado em lote pelo XPAggregator)
         min_xp = cfg.get("xp_min", 15)
         max_xp = cfg.get("xp_max", 25)
-        amount = random.randint(min_xp, max_xp)
-        old_level, new_level = self.leveling.add_xp(message.guild.id, message.author.id, amount)
-
-        # Level up! (channel notification — stays as embed)
-        if new_level > old_level:
-            notify_channel_id = cfg.get("notify_channel_id")
-            channel = message.guild.get_channel(notify_channel_id) if notify_channel_id else message.channel
-
-            msg_template = cfg.get("levelup_message", "{user} subiu para o **nivel {level}**")
-            text = msg_template.format(user=message.author.mention, level=new_level)
-
-            embed = discord.Embed(
-                title="Level Up",
-                description=text,
-                color=cfg.get("levelup_color", 0xFFD700),
-                timestamp=_utcnow()
-            )
-            embed.set_footer(text="Desenvolvido por MARKIZIN")
-
-            try:
-                await channel.send(embed=embed)
-            except Exception:
-                pass
-
-            # Cargo por nível
-            level_roles = cfg.get("level_roles", {})
-            role_id = level_roles.get(str(new_level))
-            if role_id:
-                role = message.guild.get_role(role_id)
-                if role:
-                    try:
-                        await message.author.add_roles(role, reason=f"Atingiu nível {new_level}")
-                    except Exception:
-                        pass
+        self.aggregator.award(message.author, message.channel, random.randint(min_xp, max_xp))
 
     @app_commands.command(name="rank", description="Veja seu nível e XP")
     @app_commands.describe(member="Membro para ver (opcional)")
@@ -222,8 +399,10 @@ class LevelingCommands(commands.Cog):
         await interaction.response.send_message(view=view, ephemeral=True)
 
     @app_commands.command(name="leaderboard", description="Top 10 membros com mais XP")
-    async def leaderboard(self, interaction: discord.Interaction):
-        top = self.leveling.get_leaderboard(interaction.guild.id, 10)
+    @app_commands.describe(pagina="Página do ranking (10 por página)")
+    async def leaderboard(self, interaction: discord.Interaction, pagina: app_commands.Range[int, 1, 10000] = 1):
+        offset = (pagina - 1) * 10
+        top = self.leveling.get_leaderboard(interaction.guild.id, 10, offset)
         if not top:
             view = make_error("Nenhum dado de XP ainda.")
             await interaction.response.send_message(view=view, ephemeral=True)
@@ -231,7 +410,7 @@ class LevelingCommands(commands.Cog):
 
         lines = []
         medals = {1: "🥇", 2: "🥈", 3: "🥉"}
-        for i, (uid, xp) in enumerate(top, 1):
+        for i, (uid, xp) in enumerate(top, offset + 1):
             member = interaction.guild.get_member(uid)
             name = member.display_name if member else f"ID:{uid}"
             level = _level_from_xp(xp)
@@ -239,7 +418,7 @@ class LevelingCommands(commands.Cog):
             lines.append(f"{medal} {name} — Nível **{level}** ({xp:,} XP)")
 
         view = make_card(
-            title="Ranking de Niveis",
+            title="Ranking de Niveis" if pagina == 1 else f"Ranking de Niveis — página {pagina}",
             description="\n".join(lines),
             color=0xFFD700,
             author_id=interaction.user.id,
@@ -250,33 +429,45 @@ class LevelingCommands(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     @app_commands.describe(member="Membro", level="Nível desejado")
     async def setlevel(self, interaction: discord.Interaction, member: discord.Member, level: int):
-        if level < 0:
-            view = make_error("Nível não pode ser negativo.")
+        if level < 0 or level > MAX_LEVEL:
+            view = make_error(f"Nível deve estar entre 0 e {MAX_LEVEL:,}.")
             await interaction.response.send_message(view=view, ephemeral=True)
             return
 
         # Calcular XP total para o nível
-        xp_total = sum(_xp_for_level(i) for i in range(level))
-        user = self.leveling._ensure_user(interaction.guild.id, member.id)
-        user["xp"] = xp_total
-        self.leveling._dirty = True
+        xp_total = _total_xp_for_level(level)
+        self.leveling.set_xp(interaction.guild.id, member.id, xp_total)
 
         view = make_success(f"{member.mention} agora está no **nível {level}** ({xp_total:,} XP)")
         await interaction.response.send_message(view=view, ephemeral=True)
 
 
 async def setup(bot: commands.Bot, config_manager):
-    leveling = LevelingSystem(config_manager)
+    # on_ready roda de novo a cada reconexão: o cog (e suas tasks) já existe
+    existing = bot.get_cog("LevelingCommands")
+    if existing is not None:
+        return existing.leveling
+
+    leveling = open_leveling(config_manager)
+    aggregator = XPAggregator(leveling, config_manager)
+    cog = LevelingCommands(bot, leveling, config_manager, aggregator)
+    await bot.add_cog(cog)
+    bot.xp_aggregator = aggregator
+    bot.message_pipeline.register("xp", cog.handle_message, order=bot.message_pipeline.XP)
 
     @tasks.loop(seconds=60)
     async def _flush_loop():
         leveling.flush()
 
+    @tasks.loop(seconds=2)
+    async def _xp_tick_loop():
+        aggregator.tick()
+
     @_flush_loop.before_loop
     async def _before():
         await bot.wait_until_ready()
 
     _flush_loop.start()
-    await bot.add_cog(LevelingCommands(bot, leveling, config_manager))
+    _xp_tick_loop.start()
     print("   [OK] Sistema de Niveis/XP carregado")
     return leveling
@@ -0,0 +1,51 @@
+"""
+Locks por Chave (usuário) para a Economia
+Desenvolvido por: MARKIZIN
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class _KeyLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class KeyedLockManager:
+    """Um asyncio.Lock por chave, criado sob demanda e descartado quando ninguém usa.
+
+    `hold(a, b)` adquire as chaves sempre em ordem crescente, então duas
+    transferências cruzadas (a→b e b→a) não entram em deadlock.
+    """
+
+    def __init__(self):
+        self._locks: dict = {}
+
+    @asynccontextmanager
+    async def hold(self, *keys):
+        entries = []
+        for key in sorted(set(keys)):
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = _KeyLock()
+            entry.users += 1
+            entries.append((key, entry))
+        acquired = []
+        try:
+            for _, entry in entries:
+                await entry.lock.acquire()
+                acquired.append(entry)
+            yield
+        finally:
+            for entry in reversed(acquired):
+                entry.lock.release()
+            for key, entry in entries:
+                entry.users -= 1
+                if entry.users == 0:
+                    self._locks.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._locks)
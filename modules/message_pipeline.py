@@ -0,0 +1,123 @@
+"""
+Pipeline Único de Mensagens (auto-mod → XP → estatísticas → extras)
+Desenvolvido por: MARKIZIN
+
+Cada mensagem passa uma única vez pelas checagens comuns (bot/DM) e
+carrega um `MessageContext` que busca cada módulo da config no máximo uma
+vez, compartilhado por todas as etapas. As etapas rodam em ordem; uma
+etapa pode interromper as seguintes (ex.: auto-mod apagou a mensagem).
+"""
+import time
+
+# Valor de retorno de uma etapa para interromper o pipeline. Sentinela única:
+# uma etapa que por acaso retorne True/1 não interrompe nada.
+STOP = object()
+
+
+class MessageContext:
+    """Mensagem + snapshot da configuração do servidor para esta mensagem."""
+
+    __slots__ = ("message", "guild_id", "config_manager", "_configs", "stopped")
+
+    def __init__(self, message, config_manager):
+        self.message = message
+        self.guild_id = message.guild.id
+        self.config_manager = config_manager
+        self._configs: dict = {}
+        self.stopped = False
+
+    def config(self, module: str) -> dict:
+        """Configuração do módulo (buscada uma vez por mensagem; não modificar)."""
+        cfg = self._configs.get(module)
+        if cfg is None:
+            cfg = self._configs[module] = self.config_manager.get_guild_config(self.guild_id, module)
+        return cfg
+
+
+class _Stage:
+    __slots__ = ("name", "handler", "order", "optional", "calls", "errors", "skipped", "total", "worst")
+
+    def __init__(self, name, handler, order, optional):
+        self.name = name
+        self.handler = handler
+        self.order = order
+        self.optional = optional
+        self.calls = 0
+        self.errors = 0
+        self.skipped = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+
+class MessagePipeline:
+    """Etapas registradas com `register(nome, handler, order)`.
+
+    `handler(ctx)` é uma corrotina; retornar `STOP` encerra o pipeline para
+    aquela mensagem. Etapas `optional` são puladas quando a mensagem já
+    gastou mais que `budget_ms` nas etapas anteriores.
+
+    Os tempos (orçamento e `stats()`) são de relógio, não de CPU: incluem
+    o que a etapa aguardou em I/O (ex.: `message.delete` do auto-mod) e o
+    que outras tarefas do loop rodaram nesse meio-tempo. Medem a latência
+    que cada etapa acrescenta à mensagem, não o custo de processamento.
+    """
+
+    AUTOMOD = 10
+    XP = 20
+    STATS = 30
+    TICKETS = 40
+    CUSTOM = 100
+
+    def __init__(self, config_manager, budget_ms: float = 50.0):
+        self.config_manager = config_manager
+        self.budget_ms = budget_ms
+        self._stages: list = []
+        self.messages = 0
+        self.over_budget = 0
+
+    def register(self, name: str, handler, order: int = CUSTOM, optional: bool | None = None):
+        """Registra (ou substitui) uma etapa. Extras (order >= CUSTOM) são opcionais por padrão."""
+        if optional is None:
+            optional = order >= self.CUSTOM
+        self.unregister(name)
+        self._stages.append(_Stage(name, handler, order, optional))
+        self._stages.sort(key=lambda s: s.order)
+
+    def unregister(self, name: str):
+        self._stages = [s for s in self._stages if s.name != name]
+
+    async def dispatch(self, message) -> MessageContext | None:
+        if message.author.bot or not message.guild:
+            return None
+        ctx = MessageContext(message, self.config_manager)
+        self.messages += 1
+        spent = 0.0
+        for stage in self._stages:
+            if stage.optional and spent > self.budget_ms:
+                stage.skipped += 1
+                continue
+            start = time.perf_counter()
+            try:
+                result = await stage.handler(ctx)
+            except Exception as e:
+                stage.errors += 1
+                result = None
+                print(f"  [ERRO] Etapa '{stage.name}' do pipeline de mensagens: {e}")
+            elapsed = (time.perf_counter() - start) * 1000
+            spent += elapsed
+            stage.calls += 1
+            stage.total += elapsed
+            stage.worst = max(stage.worst, elapsed)
+            if result is STOP:
+                ctx.stopped = True
+                break
+        if spent > self.budget_ms:
+            self.over_budget += 1
+        return ctx
+
+    def stats(self) -> list:
+        """[(nome, chamadas, média_ms, pior_ms, erros, puladas)] na ordem de execução (tempo de relógio)."""
+        return [
+            (s.name, s.calls, (s.total / s.calls) if s.calls else 0.0, s.worst, s.errors, s.skipped)
+            for s in self._stages
+        ]
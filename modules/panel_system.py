@@ -7,7 +7,13 @@ import discord
 from discord import app_commands
 from discord.ui import View, Button, Select, Modal, TextInput
 from typing import Dict, Any, Optional, Callable
-import json
+import asyncio
+from modules.serialization import dumpb, read_file
+from modules.storage import Storage, get_storage
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from contextlib import contextmanager
 from pathlib import Path
 import re
 from datetime import datetime, timezone
@@ -41,22 +47,157 @@ def validate_url(url: str) -> bool:
 
 # ==================== CONFIG MANAGER ====================
 
+_UNCHANGED = object()
+# Marcador persistido de "chave padrão removida pela guilda" (JSON puro)
+_DELETED_KEY = "$removido"
+
+
+def _deleted():
+    return {_DELETED_KEY: True}
+
+
+def _is_deleted(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and value.get(_DELETED_KEY) is True
+
+
+def _freeze(value):
+    """Cópia imutável (dict -> MappingProxyType, list -> tuple) para a camada de padrões."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    """Cópia mutável e independente de um valor (congelado ou não)."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _apply_override(merged: dict, default, override: dict) -> dict:
+    """Aplica `override` sobre `merged` (cópia dos padrões), tratando remoções."""
+    for k, v in override.items():
+        if _is_deleted(v):
+            merged.pop(k, None)
+        else:
+            merged[k] = _merge(default[k], v) if k in default else _thaw(v)
+    return merged
+
+
+def _merge(default, override):
+    """Sobrepõe `override` aos padrões, recursivamente em dicts, retornando cópia nova."""
+    if isinstance(default, MappingProxyType) and isinstance(override, dict):
+        return _apply_override({k: _thaw(v) for k, v in default.items()}, default, override)
+    return _thaw(override)
+
+
+def _diff(value, default, deletions: bool = False):
+    """Parte de `value` que difere dos padrões (_UNCHANGED se for igual).
+
+    Com `deletions`, chaves dos padrões ausentes em `value` viram o marcador
+    de remoção. Só vale para escritas explícitas: arquivos antigos, salvos
+    antes de uma chave nova existir nos padrões, não têm essa chave e não
+    devem ser lidos como remoção.
+    """
+    if _is_deleted(value):
+        return _thaw(value)
+    if isinstance(default, MappingProxyType) and isinstance(value, dict):
+        changed = {}
+        for k, v in value.items():
+            d = _diff(v, default[k], deletions) if k in default else _thaw(v)
+            if d is not _UNCHANGED:
+                changed[k] = d
+        if deletions:
+            for k in default:
+                if k not in value:
+                    changed[k] = _deleted()
+        return changed or _UNCHANGED
+    return _UNCHANGED if value == _thaw(default) else _thaw(value)
+
+
 class ConfigManager:
-    """Gerenciador central de configurações com persistência."""
+    """Gerenciador central de configurações com persistência.
+
+    Cada guilda é uma chave própria no namespace `panel_config` do `Storage`
+    (no backend de arquivos, panel_config/<guild_id>.json), carregada sob
+    demanda; salvar uma guilda reescreve apenas a chave dela.
+
+    Configuração em camadas: os padrões ficam em uma única camada imutável
+    compartilhada e cada guilda guarda (em `self.config` e no disco) apenas as
+    chaves que alterou (ou o marcador `{"$removido": true}` para uma chave
+    padrão que removeu). Leituras retornam cópias mescladas e nunca gravam;
+    a cópia parte dos padrões já descongelados (cache por módulo) e só os
+    valores mutáveis e as alterações da guilda são copiados a cada leitura.
+
+    Escrita adiada (write-behind): alterações só marcam a guilda como suja e,
+    com o event loop rodando, são agrupadas em no máximo uma escrita por
+    guilda a cada `flush_interval` segundos, feita em uma thread separada.
+    """
     
-    def __init__(self, file_path: str = "panel_config.json"):
+    def __init__(self, file_path: str = "panel_config.json", namespace: str = "panel_config",
+                 flush_interval: float = 2.0, storage: Optional[Storage] = None):
         self.file_path = Path(file_path)
-        self.config: Dict[str, Any] = self._load()
+        self.namespace = namespace
+        self.storage = storage or get_storage()
+        self.config: Dict[str, Any] = {}  # apenas as alterações de cada guilda
+        self._defaults = _freeze(self._get_default_config())
+        # módulo -> (padrões descongelados, chaves com valor mutável)
+        self._thawed_defaults: Dict[str, tuple] = {}
+        self.flush_interval = flush_interval
+        self._dirty: set = set()
+        # Revisão por (guilda, módulo): muda a cada escrita, para invalidar caches derivados
+        self._revision = 0
+        self._revisions: Dict[tuple, int] = {}
+        self._flush_handle = None
+        # Um único worker mantém as escritas de cada guilda em ordem
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="config-flush")
+        self._migrate_legacy()
     
-    def _load(self) -> Dict[str, Any]:
-        """Carrega configurações do arquivo."""
+    def _migrate_legacy(self):
+        """Divide o panel_config.json monolítico antigo em um arquivo por guilda."""
         if not self.file_path.exists():
-            return self._get_default_config()
+            return
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, ValueError):
-            return self._get_default_config()
+            legacy = read_file(self.file_path)
+        except ValueError:
+            return
+        for guild_key, guild_cfg in legacy.items():
+            if guild_key.isdigit() and isinstance(guild_cfg, dict):
+                self.config[guild_key] = self._strip_defaults(guild_cfg)
+                self._save_guild(guild_key)
+        self.file_path.replace(self.file_path.with_name(self.file_path.name + ".migrado"))
+        print(f"   [OK] panel_config.json migrado para {self.namespace}/ ({len(self.config)} servidores)")
+    
+    def _load_guild(self, guild_key: str) -> Optional[Dict[str, Any]]:
+        """Carrega a configuração de uma guilda do armazenamento (cache em memória)."""
+        if guild_key in self.config:
+            return self.config[guild_key]
+        data = self.storage.get(self.namespace, guild_key)
+        if not isinstance(data, dict):
+            return None
+        # Arquivos antigos traziam a cópia completa dos padrões; em memória
+        # ficam só as alterações e o arquivo encolhe na próxima gravação.
+        self.config[guild_key] = self._strip_defaults(data)
+        return self.config[guild_key]
+    
+    def _ensure_guild(self, guild_key: str) -> Dict[str, Any]:
+        guild_cfg = self._load_guild(guild_key)
+        if guild_cfg is None:
+            guild_cfg = self.config[guild_key] = {}
+        return guild_cfg
+    
+    def _strip_defaults(self, guild_cfg: Dict[str, Any]) -> Dict[str, Any]:
+        """Remove de uma configuração completa tudo que é igual ao padrão."""
+        overrides = {}
+        for module, data in guild_cfg.items():
+            changed = _diff(data, self._defaults.get(module, MappingProxyType({})))
+            if changed is not _UNCHANGED:
+                overrides[module] = changed
+        return overrides
     
     def _get_default_config(self) -> Dict[str, Any]:
         """Retorna configuração padrão para todos os módulos."""
@@ -203,40 +344,179 @@ class ConfigManager:
             }
         }
     
-    def save(self):
-        """Salva configurações no arquivo de forma atômica."""
-        tmp = self.file_path.with_suffix('.tmp')
-        with open(tmp, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2, ensure_ascii=False)
-        tmp.replace(self.file_path)
+    def _write_guild(self, guild_key: str, data: Dict[str, Any]):
+        """Grava uma guilda no armazenamento. Roda no executor."""
+        self.storage.put(self.namespace, guild_key, data)
+    
+    def _save_guild(self, guild_key: str):
+        """Salva uma guilda imediatamente (síncrono)."""
+        self._write_guild(guild_key, self.config[guild_key])
+    
+    def save(self, guild_id: Optional[int] = None):
+        """Marca uma guilda (ou todas as carregadas) para gravação.
+
+        Sem event loop rodando (scripts, inicialização) grava na hora.
+        """
+        keys = [str(guild_id)] if guild_id is not None else list(self.config)
+        self._dirty.update(k for k in keys if k in self.config)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._schedule_flush()
+    
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.flush_interval, self._flush_dirty)
+    
+    def _take_dirty(self) -> list:
+        """Copia as guildas sujas (no thread do loop) e limpa o conjunto."""
+        keys, self._dirty = self._dirty, set()
+        return [(k, _thaw(self.config[k])) for k in keys if k in self.config]
+    
+    def _flush_dirty(self):
+        self._flush_handle = None
+        loop = asyncio.get_running_loop()
+        for guild_key, data in self._take_dirty():
+            future = self._executor.submit(self._write_guild, guild_key, data)
+            future.add_done_callback(partial(self._after_write, loop, guild_key))
+    
+    def _after_write(self, loop, guild_key: str, future):
+        """Roda no worker: se a escrita falhou, a guilda volta a ficar suja e o flush é reagendado."""
+        error = future.exception()
+        if error is None:
+            return
+        print(f"  [ERRO] Falha ao salvar configuracao da guilda {guild_key}: {error} (nova tentativa em {self.flush_interval:g}s)")
+        try:
+            loop.call_soon_threadsafe(self._retry_write, guild_key)
+        except RuntimeError:
+            # Loop já fechado (desligamento): o flush() final pega a guilda
+            self._dirty.add(guild_key)
+    
+    def _retry_write(self, guild_key: str):
+        self._dirty.add(guild_key)
+        self._schedule_flush()
+    
+    def flush(self):
+        """Grava tudo que estiver pendente e espera terminar (usar no desligamento).
+
+        Guildas cuja escrita falhou continuam sujas e o primeiro erro é relançado.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        writes = [(k, self._executor.submit(self._write_guild, k, data)) for k, data in self._take_dirty()]
+        # Worker único: esperar uma tarefa vazia garante que as escritas anteriores acabaram
+        self._executor.submit(lambda: None).result()
+        failed = [(k, future.exception()) for k, future in writes if future.exception() is not None]
+        if failed:
+            self._dirty.update(k for k, _ in failed)
+            for guild_key, error in failed:
+                print(f"  [ERRO] Falha ao salvar configuracao da guilda {guild_key}: {error}")
+            raise failed[0][1]
     
     def get_guild_config(self, guild_id: int, module: str) -> Dict[str, Any]:
-        """Retorna configuração de um módulo específico de uma guilda."""
+        """Retorna configuração de um módulo específico de uma guilda.
+
+        O dict retornado é uma cópia (padrões + alterações); para persistir
+        mudanças use set_guild_config/update_guild_config.
+        """
+        overrides = self._load_guild(str(guild_id)) or {}
+        override = overrides.get(module)
+        base, containers = self._module_defaults(module)
+        merged = dict(base)
+        for k in containers:
+            if not override or k not in override:
+                merged[k] = _thaw(base[k])
+        if not override:
+            return merged
+        return _apply_override(merged, self._defaults.get(module, MappingProxyType({})), override)
+    
+    def _module_defaults(self, module: str) -> tuple:
+        """Padrões do módulo já descongelados (uma vez) e as chaves que precisam de cópia."""
+        cached = self._thawed_defaults.get(module)
+        if cached is None:
+            base = _thaw(self._defaults.get(module, MappingProxyType({})))
+            containers = tuple(k for k, v in base.items() if isinstance(v, (dict, list)))
+            cached = self._thawed_defaults[module] = (base, containers)
+        return cached
+    
+    def _store_module(self, guild_id: int, module: str, merged: Dict[str, Any]):
+        """Guarda apenas a diferença entre `merged` e os padrões do módulo."""
         guild_key = str(guild_id)
-        if guild_key not in self.config:
-            self.config[guild_key] = self._get_default_config()
-            self.save()
-        return self.config[guild_key].get(module, {})
+        guild_cfg = self._ensure_guild(guild_key)
+        changed = _diff(merged, self._defaults.get(module, MappingProxyType({})), deletions=True)
+        if changed is _UNCHANGED:
+            guild_cfg.pop(module, None)
+        else:
+            guild_cfg[module] = changed
+        self._bump(guild_key, module)
+        self.save(guild_id)
+    
+    def _bump(self, guild_key: str, module: str):
+        self._revision += 1
+        self._revisions[(guild_key, module)] = self._revision
+    
+    def revision(self, guild_id: int, module: str) -> int:
+        """Número que muda sempre que o módulo da guilda é alterado (0 = nunca).
+
+        Barato o bastante para ser consultado a cada mensagem por caches que
+        compilam algo a partir da configuração.
+        """
+        return self._revisions.get((str(guild_id), module), 0)
     
     def set_guild_config(self, guild_id: int, module: str, key: str, value: Any):
         """Define uma configuração específica."""
-        guild_key = str(guild_id)
-        if guild_key not in self.config:
-            self.config[guild_key] = self._get_default_config()
-        if module not in self.config[guild_key]:
-            self.config[guild_key][module] = {}
-        self.config[guild_key][module][key] = value
-        self.save()
+        merged = self.get_guild_config(guild_id, module)
+        merged[key] = value
+        self._store_module(guild_id, module, merged)
     
     def update_guild_config(self, guild_id: int, module: str, data: Dict[str, Any]):
         """Atualiza múltiplas configurações de uma vez."""
+        merged = self.get_guild_config(guild_id, module)
+        merged.update(data)
+        self._store_module(guild_id, module, merged)
+    
+    def delete_guild_config(self, guild_id: int, module: str, key: str):
+        """Remove uma chave (inclusive uma que existe nos padrões)."""
+        merged = self.get_guild_config(guild_id, module)
+        merged.pop(key, None)
+        self._store_module(guild_id, module, merged)
+    
+    @contextmanager
+    def batch(self, guild_id: int):
+        """Transação com vários módulos de uma guilda: tudo ou nada, uma escrita.
+
+        As mudanças feitas no `ConfigBatch` só são aplicadas se o bloco
+        terminar sem exceção e a validação passar; então a guilda é marcada
+        como suja e entra na escrita adiada normal (uma escrita atômica do
+        arquivo dela, fora do event loop).
+        """
+        staged = ConfigBatch(self, guild_id)
+        yield staged
+        self._commit_batch(guild_id, staged)
+    
+    def _commit_batch(self, guild_id: int, staged: "ConfigBatch"):
+        if not staged.modules:
+            return
         guild_key = str(guild_id)
-        if guild_key not in self.config:
-            self.config[guild_key] = self._get_default_config()
-        if module not in self.config[guild_key]:
-            self.config[guild_key][module] = {}
-        self.config[guild_key][module].update(data)
-        self.save()
+        candidate = dict(self._ensure_guild(guild_key))
+        for module, merged in staged.modules.items():
+            changed = _diff(merged, self._defaults.get(module, MappingProxyType({})), deletions=True)
+            if changed is _UNCHANGED:
+                candidate.pop(module, None)
+            else:
+                candidate[module] = changed
+        try:
+            dumpb(candidate)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Configuração inválida, nada foi aplicado: {e}") from e
+        self.config[guild_key] = candidate
+        for module in staged.modules:
+            self._bump(guild_key, module)
+        self.save(guild_id)
 
     # ======== APLICAÇÃO DE ESTILO GLOBAL ========
     def apply_style(self, guild_id: int, embed: discord.Embed) -> discord.Embed:
@@ -264,6 +544,37 @@ class ConfigManager:
         return embed
 
 
+class ConfigBatch:
+    """Mudanças pendentes de um `ConfigManager.batch()` (mesma API de leitura/escrita)."""
+    
+    def __init__(self, manager: ConfigManager, guild_id: int):
+        self.manager = manager
+        self.guild_id = guild_id
+        self.modules: Dict[str, Dict[str, Any]] = {}
+    
+    def get(self, module: str) -> Dict[str, Any]:
+        """Configuração do módulo já com as mudanças desta transação (cópia)."""
+        if module in self.modules:
+            return _thaw(self.modules[module])
+        return self.manager.get_guild_config(self.guild_id, module)
+    
+    def _staged(self, module: str) -> Dict[str, Any]:
+        if module not in self.modules:
+            self.modules[module] = self.manager.get_guild_config(self.guild_id, module)
+        return self.modules[module]
+    
+    def set(self, module: str, key: str, value: Any):
+        self._staged(module)[key] = _thaw(value)
+    
+    def update(self, module: str, data: Dict[str, Any]):
+        if not isinstance(data, dict):
+            raise ValueError(f"Configuração do módulo '{module}' deve ser um objeto")
+        self._staged(module).update(_thaw(data))
+    
+    def delete(self, module: str, key: str):
+        self._staged(module).pop(key, None)
+
+
 # ==================== MODALS ====================
 
 class EditTextModal(Modal):
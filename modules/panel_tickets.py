@@ -3,11 +3,40 @@ Painel de Tickets - Configuração Avançada
 Desenvolvido por: MARKIZIN
 """
 import discord
+import asyncio
 import datetime
 from discord.ui import Button
 from .panel_system import BasePanel, ChannelSelect, EditTextModal
+from .ticket_sla import priority_key
 from typing import Any, Dict
 
+
+def register_ticket(client, guild_id: int, channel: discord.TextChannel, opener_id: int, priority: str | None):
+    """Registra um ticket recém-criado no registro, na atividade e no SLA."""
+    opened_at = channel.created_at.timestamp()
+    client.ticket_registry.open(guild_id, channel.id, opener_id, priority=priority,
+                                category_id=channel.category_id, opened_at=opened_at)
+    client.ticket_activity.touch(guild_id, channel.id, opened_at)
+    client.ticket_sla.open(guild_id, channel.id, opener_id, priority_key(priority), opened_at)
+
+
+def forget_ticket(client, channel_id: int):
+    """Tira um ticket fechado (ou cujo canal sumiu) do registro, da atividade, do SLA e do transcript ao vivo."""
+    client.ticket_registry.close(channel_id)
+    client.ticket_activity.forget(channel_id)
+    client.ticket_sla.close(channel_id)
+    client.ticket_transcripts.discard(channel_id)
+
+
+async def archive_transcript(client, guild_id: int, channel_id: int, name: str, ticket: dict):
+    """Move o transcript do ticket para o arquivo pesquisável (/ticket-busca)."""
+    store = client.ticket_transcripts
+    await asyncio.get_running_loop().run_in_executor(None, store.archive, channel_id, lambda path: client.transcript_archive.add(
+        channel_id, guild_id, name, path,
+        opener_id=ticket.get('opener_id'), opened_at=ticket.get('opened_at'),
+    ))
+    store.html_path(channel_id).unlink(missing_ok=True)
+
 class TicketsPanel(BasePanel):
     def __init__(self, config_manager, guild_id: int, author_id: int):
         super().__init__(config_manager, guild_id, author_id, "tickets")
@@ -440,37 +469,21 @@ class ViewStatsButton(Button):
         super().__init__(label="Estatísticas", style=discord.ButtonStyle.secondary, emoji="📊", row=2)
         self.panel = panel
     async def callback(self, interaction: discord.Interaction):
-        cfg = self.panel.get_config()
         guild = interaction.guild
-        category_ids = cfg.get('category_ids') or ([] if not cfg.get('category_id') else [cfg.get('category_id')])
         stats = {}
-        total_open = 0
         priority_counts = {}
-        for cid in category_ids:
-            cat = guild.get_channel(cid)
-            if not isinstance(cat, discord.CategoryChannel):
-                continue
-            cat_open = 0
-            for ch in cat.channels:
-                if isinstance(ch, discord.TextChannel) and ch.topic and 'user:' in ch.topic:
-                    cat_open += 1
-                    total_open += 1
-                    if 'priority:' in ch.topic:
-                        try:
-                            pr = ch.topic.split('priority:')[1].split()[0].upper()
-                            priority_counts[pr] = priority_counts.get(pr,0)+1
-                        except:
-                            pass
-            stats[cat.name] = cat_open
-        # Tempo médio de criação (idade média)
         ages = []
-        for cid in category_ids:
-            cat = guild.get_channel(cid)
-            if not isinstance(cat, discord.CategoryChannel):
-                continue
-            for ch in cat.channels:
-                if isinstance(ch, discord.TextChannel) and ch.topic and 'user:' in ch.topic:
-                    ages.append((discord.utils.utcnow() - ch.created_at).total_seconds()/60)
+        now = discord.utils.utcnow().timestamp()
+        tickets = interaction.client.ticket_registry.guild_tickets(guild.id)
+        for _, ticket in tickets:
+            cat = guild.get_channel(ticket.get('category_id')) if ticket.get('category_id') else None
+            cat_name = cat.name if cat else 'Sem categoria'
+            stats[cat_name] = stats.get(cat_name, 0) + 1
+            if ticket.get('priority'):
+                pr = ticket['priority'].upper()
+                priority_counts[pr] = priority_counts.get(pr, 0) + 1
+            ages.append((now - ticket.get('opened_at', now)) / 60)
+        total_open = len(tickets)
         avg_age = (sum(ages)/len(ages)) if ages else 0
         desc_lines = [f"Total abertos: {total_open}", f"Idade média (min): {avg_age:.1f}"]
         if priority_counts:
@@ -584,22 +597,7 @@ class OpenTicketButton(discord.ui.Button):
             await interaction.response.send_message('❌ Sistema de tickets desativado.', ephemeral=True)
             return
         # Limite por usuário
-        user_open = 0
-        # Contar em todas categorias configuradas ou categoria única
-        categories_to_scan = []
-        if cfg.get('category_ids'):
-            for cid in cfg.get('category_ids'):
-                cat = guild.get_channel(cid)
-                if isinstance(cat, discord.CategoryChannel):
-                    categories_to_scan.append(cat)
-        else:
-            cat_single = guild.get_channel(cfg.get('category_id')) if cfg.get('category_id') else None
-            if isinstance(cat_single, discord.CategoryChannel):
-                categories_to_scan.append(cat_single)
-        for cat in categories_to_scan:
-            for ch in cat.channels:
-                if ch.topic and f'user:{interaction.user.id}' in ch.topic:
-                    user_open += 1
+        user_open = interaction.client.ticket_registry.open_count(guild.id, interaction.user.id)
         max_open = cfg.get('max_open_per_user', 3)
         if user_open >= max_open:
             await interaction.response.send_message(f'❌ Você já possui {user_open} tickets abertos (limite {max_open}).', ephemeral=True)
@@ -725,6 +723,7 @@ class OpenTicketButton(discord.ui.Button):
         if priority_selected:
             topic += f' priority:{priority_selected}'
         channel = await guild.create_text_channel(name, category=target_category, overwrites=overwrites, topic=topic)
+        register_ticket(interaction.client, guild.id, channel, interaction.user.id, priority_selected)
         opener_desc = cfg.get('ticket_open_description', 'Explique seu problema. Um membro da equipe responderá em breve.')
         if initial_subject:
             opener_desc = f"**Assunto:** {initial_subject}\n\n{initial_description}"
@@ -752,15 +751,15 @@ class ClaimTicketButton(discord.ui.Button):
         if not channel or not isinstance(channel, discord.TextChannel):
             await interaction.response.send_message('❌ Canal inválido.', ephemeral=True)
             return
-        # Marca claim no topic
-        if channel.topic and 'claimed:' in channel.topic:
+        registry = interaction.client.ticket_registry
+        ticket = registry.get(channel.id)
+        if ticket is None:
+            await interaction.response.send_message('❌ Este canal não é um ticket aberto.', ephemeral=True)
+            return
+        # Marca claim no registro (sem editar o tópico do canal)
+        if not registry.claim(channel.id, interaction.user.id):
             await interaction.response.send_message('⚠️ Ticket já possui claim.', ephemeral=True)
             return
-        new_topic = (channel.topic or '') + f' claimed:{interaction.user.id}'
-        try:
-            await channel.edit(topic=new_topic)
-        except Exception:
-            pass
         await interaction.response.send_message(f'✅ Você assumiu este ticket.', ephemeral=True)
         try:
             await channel.send(f'👤 Ticket agora sendo atendido por {interaction.user.mention}.')
@@ -777,43 +776,26 @@ class CloseTicketButton(discord.ui.Button):
         if not cfg.get('enabled'):
             await interaction.response.send_message('❌ Sistema de tickets desativado.', ephemeral=True)
             return
+        ticket = interaction.client.ticket_registry.get(channel.id) or {}
         # Verificar claim obrigatório
         if cfg.get('claim_required'):
-            if not channel.topic or 'claimed:' not in channel.topic:
+            if not ticket.get('claimed_by'):
                 await interaction.response.send_message('❌ Este ticket precisa ser assumido (claim) antes de fechar.', ephemeral=True)
                 return
-        # Transcript
-        transcript_url = None
+        # Responder antes do transcript: o prazo da interação é de 3s
+        try:
+            await interaction.response.send_message('🔒 Fechando ticket...', ephemeral=True)
+        except Exception:
+            pass
+        # Transcript (gravado durante o ticket; aqui só completa e gera o HTML)
+        file = None
         if cfg.get('transcript_enabled'):
-            all_messages = []
-            async for msg in channel.history(limit=1000, oldest_first=True):
-                created = msg.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                content = (msg.content or '').replace('\n', '<br>')
-                all_messages.append(f"<div><b>{msg.author.display_name}</b> <span style='color:gray'>[{created}]</span><br>{content}</div>")
-            # Chunk em partes de 300 para evitar embeds gigantes
-            from pathlib import Path
-            transcripts_dir = Path('transcripts')
-            transcripts_dir.mkdir(exist_ok=True)
-            chunk_size = 300
-            files = []
-            for i in range(0, len(all_messages), chunk_size):
-                chunk = all_messages[i:i+chunk_size]
-                html = "<html><body><h2>Transcript Ticket</h2>" + "\n".join(chunk) + "</body></html>"
-                disk_path = transcripts_dir / f"transcript_{channel.name}_part{i//chunk_size+1}.html"
-                try:
-                    disk_path.write_text(html, encoding='utf-8')
-                except Exception:
-                    pass
-                files.append(discord.File(fp=html.encode('utf-8'), filename=disk_path.name))
-            file = files[0] if files else None
-        else:
-            file = None
-        opener_id = None
-        if channel.topic and 'user:' in channel.topic:
             try:
-                opener_id = int(channel.topic.split('user:')[1].split()[0])
-            except Exception:
-                pass
+                path = await interaction.client.ticket_transcripts.finalize(channel, f'Transcript {channel.name}')
+                file = discord.File(path, filename=f'transcript_{channel.name}.html.gz')
+            except Exception as e:
+                print(f"  [ERRO] Falha ao gerar transcript de {channel.name}: {e}")
+        opener_id = ticket.get('opener_id')
         # Feedback
         if cfg.get('feedback_enabled') and opener_id:
             member = interaction.guild.get_member(opener_id)
@@ -845,16 +827,16 @@ class CloseTicketButton(discord.ui.Button):
                 except Exception:
                     pass
         try:
-            await interaction.response.send_message('🔒 Fechando ticket...', ephemeral=True)
+            if file:
+                await channel.send(content='🧾 Transcript gerado.', file=file)
         except Exception:
             pass
+        if cfg.get('transcript_enabled'):
+            try:
+                await archive_transcript(interaction.client, interaction.guild.id, channel.id, channel.name, ticket)
+            except Exception as e:
+                print(f"  [ERRO] Falha ao arquivar transcript de {channel.name}: {e}")
         try:
-            if file:
-                await channel.send(content='🧾 Transcript gerado (parte 1).', file=file)
-                # Enviar partes adicionais
-                if cfg.get('transcript_enabled') and 'files' in locals() and len(files) > 1:
-                    for extra in files[1:]:
-                        await channel.send(file=extra)
             await channel.edit(name=channel.name + '-fechado')
         except Exception:
             pass
@@ -867,6 +849,7 @@ class CloseTicketButton(discord.ui.Button):
             await channel.delete(reason='Ticket fechado')
         except Exception:
             pass
+        forget_ticket(interaction.client, channel.id)
         # Incrementar contador fechado
         closed = cfg.get('closed_counter', 0) + 1
         self.config_manager.update_guild_config(interaction.guild.id, 'tickets', {'closed_counter': closed})
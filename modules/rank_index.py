@@ -0,0 +1,149 @@
+"""
+Índice Ordenado Incremental (ranking de XP / economia)
+Desenvolvido por: MARKIZIN
+"""
+from bisect import bisect_left, bisect_right, insort
+
+
+class _Fenwick:
+    """Somas de prefixo dos tamanhos dos baldes em O(log B)."""
+
+    __slots__ = ("_tree",)
+
+    def __init__(self, sizes):
+        tree = [0] * (len(sizes) + 1)
+        for i, size in enumerate(sizes, 1):
+            tree[i] += size
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def add(self, i: int, delta: int):
+        i += 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def find(self, pos: int) -> tuple:
+        """(balde, itens antes dele) do balde que contém a posição `pos`, em O(log B)."""
+        tree = self._tree
+        i = 0
+        before = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = i + step
+            if nxt < len(tree) and before + tree[nxt] <= pos:
+                i = nxt
+                before += tree[nxt]
+            step >>= 1
+        return i, before
+
+    def prefix(self, i: int) -> int:
+        """Soma dos tamanhos dos baldes [0, i)."""
+        total = 0
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
+class SortedBuckets:
+    """Lista ordenada em baldes de até 2*LOAD itens.
+
+    add/remove custam O(log n + LOAD), `rank()` custa O(log n) e
+    `head(k, offset)` custa O(log n + k): a árvore de Fenwick localiza o
+    balde do `offset` sem percorrer os anteriores. Os itens precisam ser
+    comparáveis e únicos (ex.: tuplas (-xp, user_id)).
+    """
+
+    LOAD = 512
+
+    def __init__(self, items=()):
+        items = sorted(items)
+        self._buckets = [items[i:i + self.LOAD] for i in range(0, len(items), self.LOAD)]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [b[-1] for b in self._buckets]
+        self._sizes = _Fenwick([len(b) for b in self._buckets])
+        self._len = sum(len(b) for b in self._buckets)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, item):
+        if not self._buckets:
+            self._buckets.append([item])
+            self._rebuild()
+            return
+        i = bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            i -= 1
+        bucket = self._buckets[i]
+        insort(bucket, item)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._rebuild()
+        else:
+            self._sizes.add(i, 1)
+
+    def remove(self, item):
+        """Remove `item`; ValueError se não existir."""
+        i = bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            raise ValueError(f"{item!r} não está no índice")
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, item)
+        if j == len(bucket) or bucket[j] != item:
+            raise ValueError(f"{item!r} não está no índice")
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._sizes.add(i, -1)
+        else:
+            del self._buckets[i]
+            self._rebuild()
+
+    def discard(self, item):
+        try:
+            self.remove(item)
+        except ValueError:
+            pass
+
+    def rank(self, item) -> int:
+        """Quantos itens são menores que `item` (posição 0-based se existir)."""
+        i = bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            return self._len
+        return self._sizes.prefix(i) + bisect_left(self._buckets[i], item)
+
+    def count_le(self, item) -> int:
+        """Quantos itens são <= `item`."""
+        i = bisect_right(self._maxes, item)
+        if i == len(self._maxes):
+            return self._len
+        return self._sizes.prefix(i) + bisect_right(self._buckets[i], item)
+
+    def head(self, k: int, offset: int = 0) -> list:
+        """Itens nas posições [offset, offset + k), em ordem."""
+        out = []
+        if k <= 0 or offset >= self._len:
+            return out
+        b, skipped = self._sizes.find(offset)
+        start = offset - skipped
+        while b < len(self._buckets) and len(out) < k:
+            bucket = self._buckets[b]
+            out.extend(bucket[start:start + (k - len(out))])
+            start = 0
+            b += 1
+        return out
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
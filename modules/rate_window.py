@@ -0,0 +1,71 @@
+"""
+Janela Deslizante Limitada (anti-spam do auto-mod)
+Desenvolvido por: MARKIZIN
+"""
+import sys
+from collections import OrderedDict, deque
+
+
+class SlidingWindowTracker:
+    """Timestamps recentes por chave, com memória limitada.
+
+    - cada chave guarda um deque com no máximo `limit + 1` entradas, podado
+      pela frente em O(1) amortizado;
+    - as chaves ficam em ordem de uso (LRU); passando de `max_keys`, as
+      menos recentes são descartadas;
+    - `sweep()` remove chaves ociosas começando pelas mais antigas, então só
+      visita o que de fato expirou.
+    """
+
+    def __init__(self, max_keys: int = 50_000, idle_seconds: float = 600.0):
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self._windows: OrderedDict = OrderedDict()
+        self.evictions = 0
+        self.swept = 0
+
+    def hit(self, key, now: float, window: float, limit: int) -> int:
+        """Registra um evento e retorna quantos caem na janela (no máximo limit + 1)."""
+        times = self._windows.get(key)
+        if times is None or times.maxlen != limit + 1:
+            existed = times is not None
+            times = deque(times or (), maxlen=limit + 1)
+            self._windows[key] = times
+            if existed:
+                self._windows.move_to_end(key)
+            elif len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._windows.move_to_end(key)
+        cutoff = now - window
+        while times and times[0] < cutoff:
+            times.popleft()
+        times.append(now)
+        return len(times)
+
+    def sweep(self, now: float, idle_seconds: float | None = None) -> int:
+        """Remove chaves sem eventos há mais de `idle_seconds`."""
+        cutoff = now - (self.idle_seconds if idle_seconds is None else idle_seconds)
+        removed = 0
+        while self._windows:
+            key, times = next(iter(self._windows.items()))
+            if times and times[-1] >= cutoff:
+                break
+            self._windows.popitem(last=False)
+            removed += 1
+        self.swept += removed
+        return removed
+
+    def clear(self):
+        self._windows.clear()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def stats(self) -> dict:
+        """Chaves, descartes e memória aproximada (bytes) para /metricas."""
+        size = sys.getsizeof(self._windows)
+        for times in self._windows.values():
+            size += sys.getsizeof(times) + 24 * len(times)  # deque + floats
+        return {"keys": len(self._windows), "evictions": self.evictions, "swept": self.swept, "bytes": size}
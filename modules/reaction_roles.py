@@ -0,0 +1,73 @@
+"""
+Índice de Reaction Roles por (mensagem, emoji)
+Desenvolvido por: MARKIZIN
+"""
+
+
+def emoji_key(emoji) -> str:
+    """Chave no mesmo formato salvo na config: unicode puro ou <a:nome:id>/<:nome:id>."""
+    if emoji.is_custom_emoji():
+        return f"<{'a' if emoji.animated else ''}:{emoji.name}:{emoji.id}>"
+    return str(emoji)
+
+
+class ReactionRoleMap:
+    """`autorole.reaction_roles` de um servidor, indexado.
+
+    - by_message : message_id -> {emoji -> entrada}
+    - unique     : message_id -> [entradas com `unique`]
+    - by_role    : role_id -> [entradas]
+    Entradas repetidas para o mesmo (mensagem, emoji) mantêm a primeira,
+    como fazia a busca linear.
+    """
+
+    __slots__ = ("enabled", "by_message", "unique", "by_role")
+
+    def __init__(self, cfg: dict):
+        self.enabled = bool(cfg.get("enabled"))
+        self.by_message: dict = {}
+        self.unique: dict = {}
+        self.by_role: dict = {}
+        for rr in cfg.get("reaction_roles", []):
+            message_id = rr.get("message_id")
+            self.by_message.setdefault(message_id, {}).setdefault(rr.get("emoji", ""), rr)
+            if rr.get("unique"):
+                self.unique.setdefault(message_id, []).append(rr)
+            self.by_role.setdefault(rr.get("role_id"), []).append(rr)
+
+    def lookup(self, message_id: int, channel_id: int, emoji) -> dict | None:
+        """Entrada para a reação, ou None. Mensagens sem reaction role custam um miss de dict."""
+        if not self.enabled:
+            return None
+        entries = self.by_message.get(message_id)
+        if entries is None:
+            return None
+        try:
+            rr = entries.get(emoji_key(emoji))
+        except Exception:
+            return None
+        if rr is None or rr.get("channel_id") != channel_id:
+            return None
+        return rr
+
+
+class ReactionRoleIndex:
+    """Cache de `ReactionRoleMap` por servidor, invalidado pela revisão da config."""
+
+    MODULE = "autorole"
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self._cache: dict = {}
+
+    def for_guild(self, guild_id: int) -> ReactionRoleMap:
+        revision = self.config_manager.revision(guild_id, self.MODULE)
+        cached = self._cache.get(guild_id)
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        index = ReactionRoleMap(self.config_manager.get_guild_config(guild_id, self.MODULE))
+        self._cache[guild_id] = (revision, index)
+        return index
+
+    def forget(self, guild_id: int):
+        self._cache.pop(guild_id, None)
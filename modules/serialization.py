@@ -0,0 +1,67 @@
+"""
+Serialização JSON Compartilhada pelos Armazenamentos
+Desenvolvido por: MARKIZIN
+
+Usa orjson quando instalado (bem mais rápido) e cai para o json da
+biblioteca padrão caso contrário. Stores quentes gravam JSON compacto;
+exportações e backups, feitos para humanos lerem, usam `pretty=True`.
+"""
+import json
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+if orjson:
+    # OPT_NON_STR_KEYS: chaves int viram string, como no json padrão
+    _OPTS = orjson.OPT_NON_STR_KEYS
+    _PRETTY_OPTS = _OPTS | orjson.OPT_INDENT_2
+
+
+def _stdlib_dumps(obj, pretty: bool) -> str:
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumpb(obj, pretty: bool = False) -> bytes:
+    """Serializa para bytes UTF-8 (use com Path.write_bytes)."""
+    if orjson:
+        try:
+            return orjson.dumps(obj, option=_PRETTY_OPTS if pretty else _OPTS)
+        except TypeError:
+            # Tipos que o orjson recusa (ex.: int > 64 bits): o json padrão decide
+            pass
+    return _stdlib_dumps(obj, pretty).encode("utf-8")
+
+
+def dumps(obj, pretty: bool = False) -> str:
+    """Serializa para str (ex.: linhas de diário)."""
+    if orjson:
+        return dumpb(obj, pretty).decode("utf-8")
+    return _stdlib_dumps(obj, pretty)
+
+
+def loads(data):
+    """Desserializa str ou bytes. Erros de formato são ValueError."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_file(path):
+    """Lê e desserializa um arquivo JSON inteiro."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def write_file(path, obj, pretty: bool = False):
+    """Grava de forma atômica (tmp + replace)."""
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(dumpb(obj, pretty))
+    tmp.replace(path)
@@ -7,31 +7,23 @@ from discord import app_commands
 from discord.ext import commands
 from datetime import datetime, timedelta
 from collections import defaultdict
-import json
-from pathlib import Path
+from modules.storage import ROOT, get_storage
 
 class StatsSystem:
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, storage=None):
         self.config_manager = config_manager
-        self.stats_file = Path("stats.json")
+        self.storage = storage or get_storage()
         self.stats = self._load_stats()
         self._dirty = False
 
     def _load_stats(self) -> dict:
-        """Carrega estatísticas do arquivo."""
-        if not self.stats_file.exists():
-            return {}
-        try:
-            with open(self.stats_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return {}
+        """Carrega estatísticas do armazenamento."""
+        return self.storage.get(ROOT, "stats", {})
 
     def _save_stats(self):
-        """Salva estatísticas no arquivo."""
+        """Salva estatísticas no armazenamento."""
         try:
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(self.stats, f, indent=2, ensure_ascii=False)
+            self.storage.put(ROOT, "stats", self.stats)
             self._dirty = False
         except Exception as e:
             print(f"Erro ao salvar estatísticas: {e}")
@@ -84,6 +76,17 @@ class StatsSystem:
                 "last_reset": datetime.now().isoformat()
             }
     
+    def track_message(self, guild_id: int):
+        """Conta uma mensagem na atividade do servidor."""
+        self._ensure_guild_stats(guild_id)
+        activity = self.stats[str(guild_id)].setdefault("activity", {})
+        activity["messages"] = activity.get("messages", 0) + 1
+        self._mark_dirty()
+
+    async def handle_message(self, ctx):
+        """Etapa de estatísticas do pipeline de mensagens (bot.message_pipeline)."""
+        self.track_message(ctx.guild_id)
+
     def track_command(self, guild_id: int, command_name: str):
         """Rastreia uso de comando."""
         self._ensure_guild_stats(guild_id)
@@ -576,4 +579,5 @@ async def setup(bot: commands.Bot, config_manager):
 
     _stats_flush_loop.start()
     await bot.add_cog(StatsCommands(bot, stats_system))
+    bot.message_pipeline.register("stats", stats_system.handle_message, order=bot.message_pipeline.STATS)
     return stats_system
@@ -0,0 +1,369 @@
+"""
+Camada de Armazenamento Unificada (chave/valor por namespace + diário)
+Desenvolvido por: MARKIZIN
+
+Backends:
+  - file   : um arquivo JSON por chave (layout atual: leveling.json,
+             panel_config/<guild_id>.json, inventory.journal.jsonl...)
+  - sqlite : tudo em storage.db (modo WAL)
+  - memory : nada em disco; para testes de carga e benchmarks
+
+O backend padrão vem da variável de ambiente STORAGE_BACKEND (file).
+Trocar de backend não migra dados existentes.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from modules.journal import Journal
+from modules.serialization import dumpb, dumps, loads, read_file, write_file
+
+ROOT = ""  # namespace raiz: no backend de arquivos, fica direto no diretório base
+BACKENDS = ("file", "sqlite", "memory")
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Storage:
+    """Interface comum. Valores são qualquer coisa serializável em JSON.
+
+    `get_blob`/`put_blob` guardam bytes crus (formatos binários próprios).
+    `log(name)` retorna um diário com a API do `Journal`: append(op, **campos),
+    replay(after_seq), rotate(upto_seq), advance(seq), seq, pending, close().
+    Os métodos são seguros para chamar de threads do executor.
+    """
+
+    backend = "base"
+
+    def get(self, namespace: str, key: str, default=None):
+        raise NotImplementedError
+
+    def put(self, namespace: str, key: str, value):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def keys(self, namespace: str) -> list:
+        raise NotImplementedError
+
+    def get_blob(self, namespace: str, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    def put_blob(self, namespace: str, key: str, data: bytes):
+        raise NotImplementedError
+
+    def log(self, name: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# ==================== ARQUIVOS ====================
+
+class FileStorage(Storage):
+    """Um arquivo JSON por chave, gravado de forma atômica."""
+
+    backend = "file"
+
+    def __init__(self, root: Path = Path(".")):
+        self.root = Path(root)
+        self._logs: dict = {}
+        self._lock = threading.Lock()
+
+    def _dir(self, namespace: str) -> Path:
+        return self.root / namespace if namespace else self.root
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self._dir(namespace) / f"{key}.json"
+
+    def get(self, namespace: str, key: str, default=None):
+        path = self._path(namespace, key)
+        if not path.exists():
+            return default
+        try:
+            return read_file(path)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler {path}: {e}")
+            return default
+
+    def put(self, namespace: str, key: str, value):
+        self._dir(namespace).mkdir(parents=True, exist_ok=True)
+        write_file(self._path(namespace, key), value)
+
+    def delete(self, namespace: str, key: str):
+        self._path(namespace, key).unlink(missing_ok=True)
+
+    def keys(self, namespace: str) -> list:
+        directory = self._dir(namespace)
+        if not directory.exists():
+            return []
+        return sorted(p.stem for p in directory.glob("*.json"))
+
+    def get_blob(self, namespace: str, key: str) -> bytes | None:
+        path = self._dir(namespace) / f"{key}.bin"
+        return path.read_bytes() if path.exists() else None
+
+    def put_blob(self, namespace: str, key: str, data: bytes):
+        self._dir(namespace).mkdir(parents=True, exist_ok=True)
+        path = self._dir(namespace) / f"{key}.bin"
+        # leveling.bin.tmp: with_suffix daria leveling.tmp, o mesmo temporário do leveling.json
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    def log(self, name: str) -> Journal:
+        with self._lock:
+            if name not in self._logs:
+                self._logs[name] = Journal(self.root / f"{name}.journal.jsonl")
+            return self._logs[name]
+
+    def close(self):
+        with self._lock:
+            for journal in self._logs.values():
+                journal.close()
+            self._logs.clear()
+
+
+# ==================== SQLITE ====================
+
+class SQLiteStorage(Storage):
+    """Tabelas `kv` e `logs` em um único banco SQLite (WAL)."""
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: Path = Path("storage.db")):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " namespace TEXT NOT NULL, chave TEXT NOT NULL, valor TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, chave))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS logs ("
+            " log TEXT NOT NULL, seq INTEGER NOT NULL, entrada TEXT NOT NULL,"
+            " PRIMARY KEY (log, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " namespace TEXT NOT NULL, chave TEXT NOT NULL, dados BLOB NOT NULL,"
+            " PRIMARY KEY (namespace, chave))"
+        )
+        self._logs: dict = {}
+
+    def get(self, namespace: str, key: str, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT valor FROM kv WHERE namespace = ? AND chave = ?", (namespace, str(key))
+            ).fetchone()
+        return loads(row[0]) if row else default
+
+    def put(self, namespace: str, key: str, value):
+        text = dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO kv (namespace, chave, valor) VALUES (?, ?, ?)"
+                " ON CONFLICT(namespace, chave) DO UPDATE SET valor = excluded.valor",
+                (namespace, str(key), text),
+            )
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE namespace = ? AND chave = ?", (namespace, str(key)))
+
+    def keys(self, namespace: str) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chave FROM kv WHERE namespace = ? ORDER BY chave", (namespace,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def get_blob(self, namespace: str, key: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT dados FROM blobs WHERE namespace = ? AND chave = ?", (namespace, str(key))
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put_blob(self, namespace: str, key: str, data: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO blobs (namespace, chave, dados) VALUES (?, ?, ?)"
+                " ON CONFLICT(namespace, chave) DO UPDATE SET dados = excluded.dados",
+                (namespace, str(key), bytes(data)),
+            )
+
+    def log(self, name: str) -> "SQLiteLog":
+        with self._lock:
+            if name not in self._logs:
+                self._logs[name] = SQLiteLog(self, name)
+            return self._logs[name]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteLog:
+    """Diário numa tabela; `rotate` apaga as entradas já cobertas pelo snapshot."""
+
+    def __init__(self, storage: SQLiteStorage, name: str):
+        self._storage = storage
+        self.name = name
+        with storage._lock:
+            row = storage._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0), COUNT(*) FROM logs WHERE log = ?", (name,)
+            ).fetchone()
+        self.seq, self.pending = row
+
+    def advance(self, seq: int):
+        with self._storage._lock:
+            self.seq = max(self.seq, seq)
+
+    def append(self, op: str, **fields) -> int:
+        with self._storage._lock:
+            self.seq += 1
+            entry = {"seq": self.seq, "ts": _utcnow().isoformat(), "op": op, **fields}
+            self._storage._conn.execute(
+                "INSERT INTO logs (log, seq, entrada) VALUES (?, ?, ?)", (self.name, self.seq, dumps(entry))
+            )
+            self.pending += 1
+            return self.seq
+
+    def replay(self, after_seq: int = 0):
+        with self._storage._lock:
+            rows = self._storage._conn.execute(
+                "SELECT entrada FROM logs WHERE log = ? AND seq > ? ORDER BY seq", (self.name, after_seq)
+            ).fetchall()
+        for (text,) in rows:
+            yield loads(text)
+
+    def rotate(self, upto_seq: int):
+        with self._storage._lock:
+            self._storage._conn.execute("DELETE FROM logs WHERE log = ? AND seq <= ?", (self.name, upto_seq))
+            self.pending = self._storage._conn.execute(
+                "SELECT COUNT(*) FROM logs WHERE log = ?", (self.name,)
+            ).fetchone()[0]
+
+    def close(self):
+        pass
+
+
+# ==================== MEMÓRIA ====================
+
+class MemoryStorage(Storage):
+    """Tudo em memória. Os valores são guardados serializados, então cada
+    get/put paga o mesmo custo de serialização dos outros backends e nunca
+    compartilha referências com quem chamou."""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._data: dict = {}
+        self._blobs: dict = {}
+        self._logs: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str, default=None):
+        with self._lock:
+            raw = self._data.get((namespace, str(key)))
+        return loads(raw) if raw is not None else default
+
+    def put(self, namespace: str, key: str, value):
+        raw = dumpb(value)
+        with self._lock:
+            self._data[(namespace, str(key))] = raw
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._data.pop((namespace, str(key)), None)
+
+    def keys(self, namespace: str) -> list:
+        with self._lock:
+            return sorted(k for ns, k in self._data if ns == namespace)
+
+    def get_blob(self, namespace: str, key: str) -> bytes | None:
+        with self._lock:
+            return self._blobs.get((namespace, str(key)))
+
+    def put_blob(self, namespace: str, key: str, data: bytes):
+        with self._lock:
+            self._blobs[(namespace, str(key))] = bytes(data)
+
+    def log(self, name: str) -> "MemoryLog":
+        with self._lock:
+            if name not in self._logs:
+                self._logs[name] = MemoryLog()
+            return self._logs[name]
+
+
+class MemoryLog:
+    def __init__(self):
+        self._entries: list = []
+        self._lock = threading.Lock()
+        self.seq = 0
+        self.pending = 0
+
+    def advance(self, seq: int):
+        with self._lock:
+            self.seq = max(self.seq, seq)
+
+    def append(self, op: str, **fields) -> int:
+        with self._lock:
+            self.seq += 1
+            self._entries.append({"seq": self.seq, "ts": _utcnow().isoformat(), "op": op, **fields})
+            self.pending += 1
+            return self.seq
+
+    def replay(self, after_seq: int = 0):
+        with self._lock:
+            entries = [e for e in self._entries if e["seq"] > after_seq]
+        yield from entries
+
+    def rotate(self, upto_seq: int):
+        with self._lock:
+            self._entries = [e for e in self._entries if e["seq"] > upto_seq]
+            self.pending = len(self._entries)
+
+    def close(self):
+        pass
+
+
+# ==================== SELEÇÃO ====================
+
+def open_storage(backend: str | None = None) -> Storage:
+    """Cria um backend pelo nome (ou pela variável STORAGE_BACKEND)."""
+    backend = (backend or os.getenv("STORAGE_BACKEND", "file")).strip().lower()
+    if backend == "file":
+        return FileStorage()
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"STORAGE_BACKEND inválido: {backend!r} (use {', '.join(BACKENDS)})")
+
+
+_default_storage: Storage | None = None
+
+
+def get_storage() -> Storage:
+    """Instância compartilhada usada por todos os subsistemas."""
+    global _default_storage
+    if _default_storage is None:
+        _default_storage = open_storage()
+    return _default_storage
+
+
+def set_storage(storage: Storage):
+    """Troca a instância compartilhada (ex.: MemoryStorage em testes de carga)."""
+    global _default_storage
+    _default_storage = storage
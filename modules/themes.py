@@ -113,35 +113,32 @@ class ThemeSystem:
         try:
             colors = theme["colors"]
             
-            # Aplicar cores ao módulo de boas-vindas
-            welcome_config = self.config_manager.get_guild_config(guild_id, "welcome")
-            welcome_config["color"] = colors["embed"]
-            self.config_manager.update_guild_config(guild_id, "welcome", welcome_config)
+            # Todos os módulos em uma única transação (uma escrita, tudo ou nada)
+            with self.config_manager.batch(guild_id) as cfg:
+                # Aplicar cores ao módulo de boas-vindas
+                cfg.update("welcome", {"color": colors["embed"]})
 
-            # Aplicar cores ao módulo de economia
-            economy_config = self.config_manager.get_guild_config(guild_id, "economy")
-            economy_config["saldo_color"] = colors["balance"]
-            economy_config["daily_color"] = colors["daily"]
-            self.config_manager.update_guild_config(guild_id, "economy", economy_config)
+                # Aplicar cores ao módulo de economia
+                cfg.update("economy", {
+                    "saldo_color": colors["balance"],
+                    "daily_color": colors["daily"]
+                })
 
-            # Aplicar cores ao módulo de moderação
-            moderation_config = self.config_manager.get_guild_config(guild_id, "moderation")
-            moderation_config["ban_color"] = colors["error"]
-            moderation_config["kick_color"] = colors["warning"]
-            moderation_config["warn_color"] = colors["warning"]
-            self.config_manager.update_guild_config(guild_id, "moderation", moderation_config)
+                # Aplicar cores ao módulo de moderação
+                cfg.update("moderation", {
+                    "ban_color": colors["error"],
+                    "kick_color": colors["warning"],
+                    "warn_color": colors["warning"]
+                })
 
-            # Aplicar cor ao módulo de estilo de embeds
-            embeds_config = self.config_manager.get_guild_config(guild_id, "embed_style")
-            embeds_config["default_color"] = colors["embed"]
-            self.config_manager.update_guild_config(guild_id, "embed_style", embeds_config)
-            
-            # Salvar tema atual
-            theme_config = {
-                "current_theme": theme_name.lower(),
-                "applied_at": discord.utils.utcnow().isoformat()
-            }
-            self.config_manager.update_guild_config(guild_id, "theme", theme_config)
+                # Aplicar cor ao módulo de estilo de embeds
+                cfg.update("embed_style", {"default_color": colors["embed"]})
+                
+                # Salvar tema atual
+                cfg.update("theme", {
+                    "current_theme": theme_name.lower(),
+                    "applied_at": discord.utils.utcnow().isoformat()
+                })
             
             return True
         except Exception as e:
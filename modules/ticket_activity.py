@@ -0,0 +1,120 @@
+"""
+Última Atividade dos Tickets (auto-close sem ler histórico)
+Desenvolvido por: MARKIZIN
+"""
+import heapq
+
+from modules.storage import ROOT, get_storage
+
+TICKET_ACTIVITY_KEY = "ticket_activity"
+
+
+class TicketActivityTracker:
+    """Horário da última mensagem de cada canal de ticket, por servidor.
+
+    Alimentado pelos eventos de mensagem (`touch`); nada de `history()`.
+    Cada canal tem exatamente uma entrada na fila de prioridade do seu
+    servidor, com um horário <= à última atividade real. `due()` só olha o
+    topo da fila: uma entrada vencida cujo canal teve atividade depois é
+    reposta com o horário novo, então `touch` custa O(1) e a varredura só
+    toca em tickets que realmente venceram.
+
+    Horários em segundos epoch (UTC). Persistido em `ticket_activity` como
+    {guild_id: {channel_id: horário}}.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage or get_storage()
+        self._last: dict = {}    # channel_id -> horário
+        self._heaps: dict = {}   # guild_id -> [(horário, channel_id)]
+        self._queued: set = set()  # canais com entrada na fila (inclusive esquecidos)
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        data = self.storage.get(ROOT, TICKET_ACTIVITY_KEY, {})
+        for gk, channels in data.items():
+            heap = self._heaps.setdefault(int(gk), [])
+            for ck, ts in channels.items():
+                self._last[int(ck)] = ts
+                self._queued.add(int(ck))
+                heap.append((ts, int(ck)))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def flush(self):
+        if not self._dirty:
+            return
+        # Aproveita a passada para tirar da fila os canais esquecidos
+        data: dict = {}
+        for guild_id, heap in self._heaps.items():
+            heap[:] = [(ts, ch) for ts, ch in heap if ch in self._last]
+            heapq.heapify(heap)
+            if heap:
+                data[str(guild_id)] = {str(ch): self._last[ch] for _, ch in heap}
+        self._queued = set(self._last)
+        try:
+            self.storage.put(ROOT, TICKET_ACTIVITY_KEY, data)
+            self._dirty = False
+        except Exception as e:
+            print(f"  [ERRO] Falha ao salvar atividade dos tickets: {e}")
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._last
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def channels(self) -> list:
+        return list(self._last)
+
+    def guild_channels(self) -> list:
+        """[(guild_id, channel_id)] dos canais acompanhados."""
+        return [(gid, ch) for gid, heap in self._heaps.items() for _, ch in heap if ch in self._last]
+
+    def last_activity(self, channel_id: int) -> float | None:
+        return self._last.get(channel_id)
+
+    def touch(self, guild_id: int, channel_id: int, ts: float):
+        """Registra atividade (ou um ticket novo) no canal."""
+        last = self._last.get(channel_id)
+        if last is None:
+            self._last[channel_id] = ts
+            if channel_id not in self._queued:
+                self._queued.add(channel_id)
+                heapq.heappush(self._heaps.setdefault(guild_id, []), (ts, channel_id))
+        elif ts > last:
+            self._last[channel_id] = ts
+        else:
+            return
+        self._dirty = True
+
+    def forget(self, channel_id: int):
+        """Ticket fechado/apagado; a entrada na fila é descartada quando chegar ao topo."""
+        if self._last.pop(channel_id, None) is not None:
+            self._dirty = True
+
+    def due(self, guild_id: int, idle_seconds: float, now: float) -> list:
+        """Canais do servidor sem atividade há `idle_seconds` ou mais.
+
+        Os vencidos continuam na fila até `forget()` (se o fechamento falhar,
+        voltam na próxima varredura).
+        """
+        heap = self._heaps.get(guild_id)
+        if not heap:
+            return []
+        limit = now - idle_seconds
+        expired = []
+        while heap and heap[0][0] <= limit:
+            ts, channel_id = heapq.heappop(heap)
+            last = self._last.get(channel_id)
+            if last is None:
+                self._queued.discard(channel_id)
+                continue
+            if last > limit:
+                heapq.heappush(heap, (last, channel_id))
+            else:
+                expired.append((last, channel_id))
+        for entry in expired:
+            heapq.heappush(heap, entry)
+        return [channel_id for _, channel_id in expired]
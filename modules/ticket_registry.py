@@ -0,0 +1,120 @@
+"""
+Registro de Tickets (dono, prioridade, claim e estado por canal)
+Desenvolvido por: MARKIZIN
+"""
+from modules.storage import ROOT, get_storage
+
+TICKET_REGISTRY_KEY = "ticket_registry"
+
+OPEN = "aberto"
+CLAIMED = "assumido"
+
+
+class TicketRegistry:
+    """Tickets abertos por canal, com índices secundários.
+
+    Substitui o tópico do canal (`user:`, `priority:`, `claimed:`) como
+    fonte da verdade: contagem por usuário, painéis e checagem de claim
+    viram consultas a dicts, sem percorrer canais nem editar tópico.
+
+    - by_guild  : guild_id -> {channel_id}
+    - by_opener : (guild_id, opener_id) -> {channel_id}
+    - by_state  : (guild_id, estado) -> {channel_id}
+    Ticket fechado sai do registro. Persistido em `ticket_registry` a cada
+    mudança (abrir/assumir/fechar são raros perto das leituras).
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage or get_storage()
+        self.tickets: dict = {}
+        self.by_guild: dict = {}
+        self.by_opener: dict = {}
+        self.by_state: dict = {}
+        for ck, ticket in self.storage.get(ROOT, TICKET_REGISTRY_KEY, {}).items():
+            self._index(int(ck), ticket)
+
+    def _save(self):
+        try:
+            self.storage.put(ROOT, TICKET_REGISTRY_KEY, {str(ch): t for ch, t in self.tickets.items()})
+        except Exception as e:
+            print(f"  [ERRO] Falha ao salvar registro de tickets: {e}")
+
+    def _index(self, channel_id: int, ticket: dict):
+        gid = ticket['guild_id']
+        self.tickets[channel_id] = ticket
+        self.by_guild.setdefault(gid, set()).add(channel_id)
+        self.by_opener.setdefault((gid, ticket.get('opener_id')), set()).add(channel_id)
+        self.by_state.setdefault((gid, ticket['state']), set()).add(channel_id)
+
+    @staticmethod
+    def _discard(index: dict, key, channel_id: int):
+        channels = index.get(key)
+        if channels is not None:
+            channels.discard(channel_id)
+            if not channels:
+                del index[key]
+
+    def _unindex(self, channel_id: int) -> dict | None:
+        ticket = self.tickets.pop(channel_id, None)
+        if ticket is not None:
+            gid = ticket['guild_id']
+            self._discard(self.by_guild, gid, channel_id)
+            self._discard(self.by_opener, (gid, ticket.get('opener_id')), channel_id)
+            self._discard(self.by_state, (gid, ticket['state']), channel_id)
+        return ticket
+
+    # ---------- consultas ----------
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self.tickets
+
+    def get(self, channel_id: int) -> dict | None:
+        return self.tickets.get(channel_id)
+
+    def guild_tickets(self, guild_id: int) -> list:
+        """[(channel_id, ticket)] abertos no servidor."""
+        return [(ch, self.tickets[ch]) for ch in self.by_guild.get(guild_id, ())]
+
+    def open_count(self, guild_id: int, opener_id: int) -> int:
+        return len(self.by_opener.get((guild_id, opener_id), ()))
+
+    def count(self, guild_id: int, state: str | None = None) -> int:
+        if state is None:
+            return len(self.by_guild.get(guild_id, ()))
+        return len(self.by_state.get((guild_id, state), ()))
+
+    # ---------- mudanças ----------
+
+    def open(self, guild_id: int, channel_id: int, opener_id: int | None, priority: str | None = None,
+             category_id: int | None = None, opened_at: float = 0.0, claimed_by: int | None = None) -> dict:
+        self._unindex(channel_id)
+        ticket = {
+            'guild_id': guild_id,
+            'opener_id': opener_id,
+            'priority': priority,
+            'category_id': category_id,
+            'claimed_by': claimed_by,
+            'opened_at': opened_at,
+            'state': CLAIMED if claimed_by else OPEN,
+        }
+        self._index(channel_id, ticket)
+        self._save()
+        return ticket
+
+    def claim(self, channel_id: int, user_id: int) -> bool:
+        """Marca o claim; False se o ticket não existir ou já tiver dono."""
+        ticket = self.tickets.get(channel_id)
+        if ticket is None or ticket.get('claimed_by'):
+            return False
+        self._unindex(channel_id)
+        ticket['claimed_by'] = user_id
+        ticket['state'] = CLAIMED
+        self._index(channel_id, ticket)
+        self._save()
+        return True
+
+    def close(self, channel_id: int) -> dict | None:
+        ticket = self._unindex(channel_id)
+        if ticket is not None:
+            self._save()
+        return ticket
@@ -0,0 +1,187 @@
+"""
+SLA de Tickets (máquina de estados por ticket)
+Desenvolvido por: MARKIZIN
+"""
+import heapq
+
+from modules.storage import ROOT, get_storage
+
+TICKET_SLA_KEY = "ticket_sla"
+
+WAITING = "aguardando"      # ninguém da equipe respondeu ainda
+RESPONDED = "respondido"    # primeira resposta da equipe registrada
+ALERT = "alerta"
+ESCALATION = "escalonamento"
+
+
+def priority_key(label: str | None) -> str | None:
+    """'🔴 Urgente' -> 'URGENTE' (chave usada em `sla_by_priority`)."""
+    if not label or not label.split():
+        return None
+    return label.split()[-1].upper()
+
+
+def sla_threshold(cfg: dict, priority: str | None) -> int | None:
+    """Minutos de SLA para a prioridade (mesma regra do antigo sla_check_task)."""
+    sla_map = cfg.get('sla_by_priority')
+    if sla_map and priority:
+        return sla_map.get(priority)
+    return cfg.get('sla_minutes')
+
+
+def sla_signature(cfg: dict) -> tuple:
+    """Só os campos da config que mudam prazos de SLA (contadores de ticket não entram)."""
+    return (
+        cfg.get('sla_minutes'),
+        tuple(sorted((cfg.get('sla_by_priority') or {}).items())),
+        cfg.get('escalation_minutes'),
+        bool(cfg.get('sla_alert_role_ids')),
+        bool(cfg.get('escalation_role_ids')),
+    )
+
+
+class TicketSLA:
+    """Estado de SLA de cada ticket, guiado por eventos.
+
+    Um ticket nasce `aguardando` (`open`) e passa a `respondido` na primeira
+    mensagem de alguém com cargo de suporte (`on_message`, O(1)). Enquanto
+    aguarda, fica na fila de prazos do servidor: `due()` só desempilha os
+    prazos vencidos e devolve cada alerta/escalonamento uma única vez.
+
+    Os prazos saem da config atual no momento do disparo; se os campos de
+    SLA da config mudarem (`sla_signature`), os tickets do servidor são
+    reagendados a partir do conjunto de tickets daquele servidor. Outras
+    mudanças na config de tickets (contadores a cada abertura/fechamento)
+    não reagendam nada. Persistido em `ticket_sla` como {channel_id: ticket}.
+    """
+
+    MODULE = "tickets"
+
+    def __init__(self, config_manager, storage=None):
+        self.config_manager = config_manager
+        self.storage = storage or get_storage()
+        self.tickets: dict = {}    # channel_id -> dict
+        self._heaps: dict = {}     # guild_id -> [(prazo, channel_id, tipo)]
+        self._by_guild: dict = {}  # guild_id -> {channel_id}
+        self._signatures: dict = {}  # guild_id -> sla_signature usada no agendamento
+        self._dirty = False
+        for ck, ticket in self.storage.get(ROOT, TICKET_SLA_KEY, {}).items():
+            self.tickets[int(ck)] = ticket
+            self._by_guild.setdefault(ticket['guild_id'], set()).add(int(ck))
+            self._schedule(int(ck), ticket)
+
+    def flush(self):
+        if not self._dirty:
+            return
+        try:
+            self.storage.put(ROOT, TICKET_SLA_KEY, {str(ch): t for ch, t in self.tickets.items()})
+            self._dirty = False
+        except Exception as e:
+            print(f"  [ERRO] Falha ao salvar SLA dos tickets: {e}")
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self.tickets
+
+    def get(self, channel_id: int) -> dict | None:
+        return self.tickets.get(channel_id)
+
+    # ---------- prazos ----------
+
+    def _deadline(self, cfg: dict, ticket: dict, kind: str) -> float | None:
+        if kind == ALERT:
+            if ticket['alerted'] or not cfg.get('sla_alert_role_ids'):
+                return None
+            minutes = sla_threshold(cfg, ticket.get('priority'))
+        else:
+            if ticket['escalated'] or not cfg.get('escalation_role_ids'):
+                return None
+            minutes = cfg.get('escalation_minutes')
+        if not minutes:
+            return None
+        return ticket['opened_at'] + minutes * 60
+
+    def _schedule(self, channel_id: int, ticket: dict, cfg: dict | None = None):
+        if ticket['state'] != WAITING:
+            return
+        guild_id = ticket['guild_id']
+        if cfg is None:
+            cfg = self.config_manager.get_guild_config(guild_id, self.MODULE)
+            self._signatures.setdefault(guild_id, sla_signature(cfg))
+        heap = self._heaps.setdefault(guild_id, [])
+        for kind in (ALERT, ESCALATION):
+            deadline = self._deadline(cfg, ticket, kind)
+            if deadline is not None:
+                heapq.heappush(heap, (deadline, channel_id, kind))
+
+    def _reschedule_guild(self, guild_id: int, cfg: dict):
+        self._heaps[guild_id] = []
+        for channel_id in self._by_guild.get(guild_id, ()):
+            self._schedule(channel_id, self.tickets[channel_id], cfg)
+
+    # ---------- eventos ----------
+
+    def open(self, guild_id: int, channel_id: int, opener_id: int | None, priority: str | None,
+             opened_at: float, responded_at: float | None = None):
+        ticket = {
+            'guild_id': guild_id,
+            'opener_id': opener_id,
+            'priority': priority,
+            'opened_at': opened_at,
+            'state': RESPONDED if responded_at else WAITING,
+            'responded_at': responded_at,
+            'alerted': False,
+            'escalated': False,
+        }
+        self.close(channel_id)
+        self.tickets[channel_id] = ticket
+        self._by_guild.setdefault(guild_id, set()).add(channel_id)
+        self._schedule(channel_id, ticket)
+        self._dirty = True
+
+    def on_message(self, channel_id: int, author, ts: float, cfg: dict) -> bool:
+        """Registra a primeira resposta da equipe. True se o ticket mudou de estado."""
+        ticket = self.tickets.get(channel_id)
+        if ticket is None or ticket['state'] != WAITING:
+            return False
+        support = cfg.get('support_role_ids', [])
+        if not support or not any(r.id in support for r in getattr(author, 'roles', ())):
+            return False
+        ticket['state'] = RESPONDED
+        ticket['responded_at'] = ts
+        self._dirty = True
+        return True
+
+    def close(self, channel_id: int):
+        """Ticket fechado; entradas na fila são descartadas ao chegar ao topo."""
+        ticket = self.tickets.pop(channel_id, None)
+        if ticket is not None:
+            channels = self._by_guild.get(ticket['guild_id'])
+            if channels is not None:
+                channels.discard(channel_id)
+                if not channels:
+                    del self._by_guild[ticket['guild_id']]
+            self._dirty = True
+
+    def due(self, guild_id: int, now: float, cfg: dict) -> list:
+        """[(channel_id, ticket, tipo)] vencidos, cada um devolvido uma única vez."""
+        signature = sla_signature(cfg)
+        if self._signatures.get(guild_id) != signature:
+            self._signatures[guild_id] = signature
+            self._reschedule_guild(guild_id, cfg)
+        heap = self._heaps.get(guild_id)
+        fired = []
+        while heap and heap[0][0] <= now:
+            _, channel_id, kind = heapq.heappop(heap)
+            ticket = self.tickets.get(channel_id)
+            if ticket is None or ticket['state'] != WAITING:
+                continue
+            deadline = self._deadline(cfg, ticket, kind)
+            if deadline is None:
+                continue
+            if deadline > now:
+                heapq.heappush(heap, (deadline, channel_id, kind))
+                continue
+            ticket['alerted' if kind == ALERT else 'escalated'] = True
+            self._dirty = True
+            fired.append((channel_id, ticket, kind))
+        return fired
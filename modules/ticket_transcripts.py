@@ -0,0 +1,263 @@
+"""
+Transcripts de Tickets em Streaming (JSONL/HTML comprimidos)
+Desenvolvido por: MARKIZIN
+"""
+import asyncio
+import gzip
+import heapq
+import html
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import discord
+
+from modules.serialization import dumps, loads
+
+TRANSCRIPTS_DIR = Path("transcripts")
+
+
+def message_record(message) -> dict:
+    return {
+        "id": message.id,
+        "author_id": message.author.id,
+        "author": message.author.display_name,
+        "bot": message.author.bot,
+        "ts": message.created_at.timestamp(),
+        "content": message.content or "",
+        "attachments": [a.url for a in message.attachments],
+    }
+
+
+class TranscriptStore:
+    """Transcript de cada ticket, gravado enquanto o ticket está aberto.
+
+    `append()` só enfileira a linha JSON em memória; `flush()` (chamado por
+    uma task, fora do event loop) anexa cada lote como um membro gzip em
+    `transcripts/<channel_id>.jsonl.gz` — membros concatenados formam um
+    único arquivo gzip válido. No fechamento, `backfill()` baixa só o que
+    falta — as mensagens antes do primeiro registro (ticket aberto antes do
+    transcript ser ativado) e as depois do último — e intercala com o que foi
+    gravado, por id de mensagem e sem repetir; `finalize()` ainda gera o HTML
+    comprimido, linha a linha. Nada é carregado inteiro na memória e não há
+    limite de mensagens.
+
+    Cada canal tem um lock de arquivo, mantido da troca do pendente até o
+    fim da escrita, e também na intercalação, no HTML e em `archive()`:
+    a task de flush nunca grava no meio de um fechamento. Depois de
+    `archive()` o canal fica selado e linhas novas são ignoradas.
+    """
+
+    BACKFILL_BATCH = 500
+
+    def __init__(self, root: Path = TRANSCRIPTS_DIR):
+        self.root = Path(root)
+        self._pending: dict = {}   # channel_id -> [linhas JSON]
+        self._file_locks: dict = {}  # channel_id -> RLock do arquivo do canal
+        self._sealed: set = set()    # canais já arquivados
+        self._bounds: dict = {}      # channel_id -> [primeiro id, último id] gravados
+        self._lock = threading.Lock()
+
+    def raw_path(self, channel_id: int) -> Path:
+        return self.root / f"{channel_id}.jsonl.gz"
+
+    def html_path(self, channel_id: int) -> Path:
+        return self.root / f"{channel_id}.html.gz"
+
+    def _history_path(self, channel_id: int) -> Path:
+        return self.root / f"{channel_id}.historico.jsonl.gz"
+
+    def file_lock(self, channel_id: int) -> threading.RLock:
+        with self._lock:
+            lock = self._file_locks.get(channel_id)
+            if lock is None:
+                lock = self._file_locks[channel_id] = threading.RLock()
+            return lock
+
+    # ---------- gravação ----------
+
+    def append(self, channel_id: int, message):
+        line = dumps(message_record(message))
+        with self._lock:
+            if channel_id not in self._sealed:
+                self._pending.setdefault(channel_id, []).append(line)
+                bounds = self._bounds.get(channel_id)
+                if bounds is not None:
+                    bounds[0] = min(bounds[0], message.id)
+                    bounds[1] = max(bounds[1], message.id)
+
+    @staticmethod
+    def _append_lines(path: Path, lines: list):
+        if not lines:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(path, "ab") as f:
+            f.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+    def _flush_channel(self, channel_id: int):
+        with self.file_lock(channel_id):
+            with self._lock:
+                lines = self._pending.pop(channel_id, None)
+            self._append_lines(self.raw_path(channel_id), lines)
+
+    def flush(self, channel_id: int | None = None):
+        """Grava as linhas pendentes (de um canal ou de todos)."""
+        if channel_id is None:
+            with self._lock:
+                channels = list(self._pending)
+        else:
+            channels = [channel_id]
+        for ch in channels:
+            try:
+                self._flush_channel(ch)
+            except OSError as e:
+                print(f"  [ERRO] Falha ao gravar transcript do canal {ch}: {e}")
+
+    def archive(self, channel_id: int, move):
+        """Grava o pendente, sela o canal e passa o arquivo para `move(path)`, tudo sob o lock do canal."""
+        with self.file_lock(channel_id):
+            self._flush_channel(channel_id)
+            with self._lock:
+                self._sealed.add(channel_id)
+            move(self.raw_path(channel_id))
+
+    def discard(self, channel_id: int):
+        """Esquece o estado em memória de um ticket fechado (o arquivo fica)."""
+        with self._lock:
+            self._pending.pop(channel_id, None)
+            self._file_locks.pop(channel_id, None)
+            self._sealed.discard(channel_id)
+            self._bounds.pop(channel_id, None)
+
+    # ---------- leitura ----------
+
+    @staticmethod
+    def _read(path: Path):
+        """Registros de um JSONL.gz em ordem de id, sem repetir mensagens."""
+        if not path.exists():
+            return
+        last = 0
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = loads(line)
+                if record["id"] <= last:
+                    continue
+                last = record["id"]
+                yield record
+
+    def iter_records(self, channel_id: int):
+        """Registros do transcript em ordem, sem repetir mensagens."""
+        return self._read(self.raw_path(channel_id))
+
+    def bounds(self, channel_id: int):
+        """(primeiro id, último id) já gravados do canal, ou None se não há registro.
+
+        Fica em memória e acompanha `append()`; só depois de um reinício o
+        arquivo é lido uma vez para recuperar os limites.
+        """
+        with self._lock:
+            bounds = self._bounds.get(channel_id)
+            if bounds is not None:
+                return tuple(bounds)
+        with self.file_lock(channel_id):
+            self._flush_channel(channel_id)
+            first = last = None
+            for record in self.iter_records(channel_id):
+                if first is None:
+                    first = record["id"]
+                last = record["id"]
+            if first is None:
+                return None
+            with self._lock:
+                self._bounds[channel_id] = [first, last]
+            return first, last
+
+    def _merge_history(self, channel_id: int):
+        """Intercala o histórico baixado com o transcript gravado (por id, sem repetir)."""
+        history = self._history_path(channel_id)
+        if not history.exists():
+            return
+        path = self.raw_path(channel_id)
+        tmp = path.with_name(path.name + ".tmp")
+        with self.file_lock(channel_id):
+            self._flush_channel(channel_id)
+            # Em empate o registro gravado ao vivo vem primeiro e prevalece
+            merged = heapq.merge(self._read(path), self._read(history), key=lambda r: r["id"])
+            last = 0
+            with gzip.open(tmp, "wt", encoding="utf-8") as out:
+                for record in merged:
+                    if record["id"] == last:
+                        continue
+                    last = record["id"]
+                    out.write(dumps(record) + "\n")
+            tmp.replace(path)
+        history.unlink(missing_ok=True)
+
+    def render_html(self, channel_id: int, title: str) -> Path:
+        """Converte o JSONL em HTML comprimido, uma mensagem por vez."""
+        with self.file_lock(channel_id):
+            return self._render_html(channel_id, title)
+
+    def _render_html(self, channel_id: int, title: str) -> Path:
+        path = self.html_path(channel_id)
+        tmp = path.with_name(path.name + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as out:
+            out.write(f"<html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head><body>")
+            out.write(f"<h2>{html.escape(title)}</h2>\n")
+            for r in self.iter_records(channel_id):
+                created = datetime.fromtimestamp(r["ts"], timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                content = html.escape(r["content"]).replace("\n", "<br>")
+                links = "".join(
+                    f"<br><a href='{html.escape(url, quote=True)}'>{html.escape(url.rsplit('/', 1)[-1])}</a>"
+                    for url in r.get("attachments", ())
+                )
+                out.write(
+                    f"<div><b>{html.escape(r['author'])}</b> <span style='color:gray'>[{created}]</span>"
+                    f"<br>{content}{links}</div>\n"
+                )
+            out.write("</body></html>\n")
+        tmp.replace(path)
+        return path
+
+    # ---------- fechamento ----------
+
+    async def _download(self, loop, history: Path, messages):
+        batch = []
+        async for msg in messages:
+            batch.append(dumps(message_record(msg)))
+            if len(batch) >= self.BACKFILL_BATCH:
+                await loop.run_in_executor(None, self._append_lines, history, batch)
+                batch = []
+        await loop.run_in_executor(None, self._append_lines, history, batch)
+
+    async def backfill(self, channel: discord.TextChannel):
+        """Baixa só as mensagens fora do que foi gravado e intercala no transcript.
+
+        Busca o que veio depois do último registro (bot fora do ar, linhas
+        ainda não vistas) e o que veio antes do primeiro (ticket aberto antes
+        do transcript ser ativado); sem nenhum registro, o canal inteiro. O
+        histórico vai para um arquivo à parte (só este método escreve nele) e
+        a intercalação roda sob o lock do canal.
+        """
+        loop = asyncio.get_running_loop()
+        history = self._history_path(channel.id)
+        await loop.run_in_executor(None, lambda: history.unlink(missing_ok=True))
+        bounds = await loop.run_in_executor(None, self.bounds, channel.id)
+        if bounds is None:
+            await self._download(loop, history, channel.history(limit=None, oldest_first=True))
+        else:
+            first, last = bounds
+            await self._download(loop, history, channel.history(
+                limit=None, before=discord.Object(id=first), oldest_first=True))
+            await self._download(loop, history, channel.history(
+                limit=None, after=discord.Object(id=last), oldest_first=True))
+        await loop.run_in_executor(None, self._merge_history, channel.id)
+        with self._lock:
+            self._bounds.pop(channel.id, None)
+
+    async def finalize(self, channel: discord.TextChannel, title: str) -> Path:
+        """Completa o transcript (`backfill()`) e gera o HTML comprimido."""
+        await self.backfill(channel)
+        return await asyncio.get_running_loop().run_in_executor(None, self.render_html, channel.id, title)
@@ -0,0 +1,193 @@
+"""
+Arquivo de Transcripts com Índice de Busca (SQLite)
+Desenvolvido por: MARKIZIN
+"""
+import gzip
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from modules.serialization import loads
+from modules.ticket_transcripts import TRANSCRIPTS_DIR
+
+ARCHIVE_DIR = TRANSCRIPTS_DIR / "arquivo"
+ARCHIVE_DB = TRANSCRIPTS_DIR / "indice.db"
+
+_WORD_RE = re.compile(r"[a-z0-9]{2,40}")
+_FIELD_RE = re.compile(r"^(autor|data):(.+)$")
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas e sem acentos ('Ação' -> 'acao')."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list:
+    return _WORD_RE.findall(_normalize(text))
+
+
+def _day(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+
+def record_terms(record: dict) -> list:
+    """Termos indexados de uma mensagem: palavras, autor (id e nome) e data (dia e mês)."""
+    day = _day(record["ts"])
+    terms = tokenize(record.get("content", ""))
+    terms.append(f"autor:{record['author_id']}")
+    terms.extend(f"autor:{t}" for t in tokenize(record.get("author", "")))
+    terms.append(f"data:{day:%Y-%m-%d}")
+    terms.append(f"data:{day:%Y-%m}")
+    return terms
+
+
+def parse_query(query: str) -> list:
+    """'reembolso autor:joao data:2024-05' -> termos no mesmo formato do índice."""
+    terms = []
+    for part in query.split():
+        match = _FIELD_RE.match(part.lower())
+        if match:
+            field, value = match.groups()
+            if field == "autor":
+                mention = re.fullmatch(r"<@!?(\d+)>", value)
+                if mention or value.isdigit():
+                    terms.append(f"autor:{mention.group(1) if mention else value}")
+                else:
+                    terms.extend(f"autor:{t}" for t in tokenize(value))
+            elif re.fullmatch(r"\d{4}-\d{2}(-\d{2})?", value):
+                terms.append(f"data:{value}")
+        else:
+            terms.extend(tokenize(part))
+    return list(dict.fromkeys(terms))
+
+
+class TranscriptArchive:
+    """Transcripts fechados, comprimidos e indexados por id do ticket (id do canal).
+
+    O JSONL.gz do ticket vai para `transcripts/arquivo/<ticket_id>.jsonl.gz`
+    e seus termos entram numa tabela de postings (termo, ticket) no SQLite.
+    Uma busca só consulta o índice; apenas os poucos resultados exibidos
+    são descomprimidos, para montar o trecho.
+    """
+
+    def __init__(self, db_path: Path = ARCHIVE_DB, root: Path = ARCHIVE_DIR):
+        self.root = Path(root)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tickets ("
+            " ticket_id INTEGER PRIMARY KEY, guild_id INTEGER NOT NULL, nome TEXT NOT NULL,"
+            " opener_id INTEGER, aberto_em REAL, fechado_em REAL NOT NULL, mensagens INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_guild ON tickets (guild_id, fechado_em DESC)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS termos ("
+            " termo TEXT NOT NULL, ticket_id INTEGER NOT NULL, ocorrencias INTEGER NOT NULL,"
+            " PRIMARY KEY (termo, ticket_id)) WITHOUT ROWID"
+        )
+
+    @contextmanager
+    def _tx(self):
+        """Transação de escrita (BEGIN IMMEDIATE ... COMMIT)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def path(self, ticket_id: int) -> Path:
+        return self.root / f"{ticket_id}.jsonl.gz"
+
+    @staticmethod
+    def _records(path: Path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            last = 0
+            for line in f:
+                if line.strip():
+                    record = loads(line)
+                    if record["id"] > last:
+                        last = record["id"]
+                        yield record
+
+    def add(self, ticket_id: int, guild_id: int, name: str, raw_path: Path,
+            opener_id: int | None = None, opened_at: float | None = None, closed_at: float | None = None):
+        """Move o transcript para o arquivo e indexa (rodar fora do event loop)."""
+        raw_path = Path(raw_path)
+        if not raw_path.exists():
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        target = self.path(ticket_id)
+        raw_path.replace(target)
+        counts: Counter = Counter()
+        messages = 0
+        for record in self._records(target):
+            messages += 1
+            counts.update(record_terms(record))
+        closed_at = closed_at or datetime.now(timezone.utc).timestamp()
+        with self._tx() as conn:
+            conn.execute("DELETE FROM termos WHERE ticket_id = ?", (ticket_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO tickets (ticket_id, guild_id, nome, opener_id, aberto_em, fechado_em, mensagens)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ticket_id, guild_id, name, opener_id, opened_at, closed_at, messages),
+            )
+            conn.executemany(
+                "INSERT INTO termos (termo, ticket_id, ocorrencias) VALUES (?, ?, ?)",
+                ((term, ticket_id, n) for term, n in counts.items()),
+            )
+
+    def search(self, guild_id: int, query: str, limit: int = 5) -> list:
+        """Tickets do servidor que contêm todos os termos, por relevância.
+
+        Retorna [{ticket_id, nome, opener_id, aberto_em, fechado_em, mensagens, ocorrencias}].
+        """
+        terms = parse_query(query)
+        if not terms:
+            return []
+        marks = ",".join("?" * len(terms))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.ticket_id, t.nome, t.opener_id, t.aberto_em, t.fechado_em, t.mensagens, m.score"
+                " FROM (SELECT ticket_id, SUM(ocorrencias) AS score FROM termos"
+                f"       WHERE termo IN ({marks}) GROUP BY ticket_id HAVING COUNT(*) = ?) AS m"
+                " JOIN tickets t ON t.ticket_id = m.ticket_id"
+                " WHERE t.guild_id = ?"
+                " ORDER BY m.score DESC, t.fechado_em DESC LIMIT ?",
+                (*terms, len(terms), guild_id, limit),
+            ).fetchall()
+        keys = ("ticket_id", "nome", "opener_id", "aberto_em", "fechado_em", "mensagens", "ocorrencias")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def snippet(self, ticket_id: int, query: str, width: int = 120) -> str | None:
+        """Primeira mensagem do ticket com uma palavra da busca (descomprime só este arquivo)."""
+        words = {t for t in parse_query(query) if ":" not in t}
+        path = self.path(ticket_id)
+        if not words or not path.exists():
+            return None
+        for record in self._records(path):
+            if words.intersection(tokenize(record.get("content", ""))):
+                text = " ".join(record["content"].split())
+                return f"{record['author']}: {text[:width]}"
+        return None
+
+    def count(self, guild_id: int) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tickets WHERE guild_id = ?", (guild_id,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -6,18 +6,17 @@ https://ggmax.com.br/perfil/markizin002
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
-from pathlib import Path
 from datetime import datetime, timezone, timedelta
 import asyncio
 import hashlib
+from modules.storage import ROOT, get_storage
 from modules.components_v2 import make_card, make_success, make_error, brand_footer, BrandedView
 
 # ⚠️ PROTEÇÃO DE AUTORIA - NÃO REMOVER
 _AUTHOR_CHECK = hashlib.md5(b"MARKIZIN").hexdigest()
 
-REMINDERS_FILE = Path("reminders.json")
-TEMP_ROLES_FILE = Path("temp_roles.json")
+REMINDERS_KEY = "reminders"
+TEMP_ROLES_KEY = "temp_roles"
 
 
 def _utcnow():
@@ -25,25 +24,19 @@ def _utcnow():
 
 
 class UtilitiesData:
-    def __init__(self):
-        self.reminders = self._load_file(REMINDERS_FILE, [])
-        self.temp_roles = self._load_file(TEMP_ROLES_FILE, [])
+    def __init__(self, storage=None):
+        self.storage = storage or get_storage()
+        self.reminders = self._load_file(REMINDERS_KEY, [])
+        self.temp_roles = self._load_file(TEMP_ROLES_KEY, [])
 
-    def _load_file(self, path, default):
-        if not path.exists():
-            return default
-        try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            return default
+    def _load_file(self, key, default):
+        return self.storage.get(ROOT, key, default)
 
-    def _save_file(self, path, data):
+    def _save_file(self, key, data):
         try:
-            tmp = path.with_suffix(".tmp")
-            tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-            tmp.replace(path)
+            self.storage.put(ROOT, key, data)
         except Exception as e:
-            print(f"Erro ao salvar {path}: {e}")
+            print(f"Erro ao salvar {key}: {e}")
 
     def add_reminder(self, user_id, channel_id, guild_id, text, fire_at):
         self.reminders.append({
@@ -53,7 +46,7 @@ class UtilitiesData:
             "text": text,
             "fire_at": fire_at
         })
-        self._save_file(REMINDERS_FILE, self.reminders)
+        self._save_file(REMINDERS_KEY, self.reminders)
 
     def get_due_reminders(self):
         now = _utcnow().isoformat()
@@ -63,7 +56,7 @@ class UtilitiesData:
     def remove_reminder(self, reminder):
         if reminder in self.reminders:
             self.reminders.remove(reminder)
-            self._save_file(REMINDERS_FILE, self.reminders)
+            self._save_file(REMINDERS_KEY, self.reminders)
 
     def add_temp_role(self, guild_id, user_id, role_id, expires_at):
         self.temp_roles.append({
@@ -72,7 +65,7 @@ class UtilitiesData:
             "role_id": role_id,
             "expires_at": expires_at
         })
-        self._save_file(TEMP_ROLES_FILE, self.temp_roles)
+        self._save_file(TEMP_ROLES_KEY, self.temp_roles)
 
     def get_expired_roles(self):
         now = _utcnow().isoformat()
@@ -81,7 +74,7 @@ class UtilitiesData:
     def remove_temp_role(self, entry):
         if entry in self.temp_roles:
             self.temp_roles.remove(entry)
-            self._save_file(TEMP_ROLES_FILE, self.temp_roles)
+            self._save_file(TEMP_ROLES_KEY, self.temp_roles)
 
 
 def _parse_duration(text: str) -> int | None: